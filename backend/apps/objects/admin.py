@@ -43,12 +43,16 @@ class ObjectAdmin(admin.ModelAdmin):
 
     responsible_link.short_description = 'Ответственный'
 
+    def save_model(self, request, obj, form, change):
+        obj._changed_by = request.user
+        super().save_model(request, obj, form, change)
+
 
 # Остальные админки...
 @admin.register(Status)
 class StatusAdmin(admin.ModelAdmin):
-    list_display = ['name', 'colored_indicator', 'order', 'is_active']
-    list_filter = ['is_active']
+    list_display = ['name', 'colored_indicator', 'category', 'order', 'is_active']
+    list_filter = ['is_active', 'category']
     search_fields = ['name']
     ordering = ['order', 'name']
 
@@ -0,0 +1,77 @@
+from rest_framework import serializers
+from ..functions import StX, StY
+from ..registry import status_registry
+from ...users.api.serializers import UserSerializer
+from ...users.models import User
+from ..images import variant_names
+from ..media import build_media_urls, media_url
+from ..models import Object
+from .serializers import StatusSerializer
+
+COMPACT_OBJECT_FIELDS = (
+    'id', 'code', 'title', 'address', 'region', 'lng', 'lat', 'description',
+    'status_id', 'responsible_id', 'start_date', 'end_date', 'created_at', 'updated_at',
+    'main_photo', 'main_photo_variants',
+)
+
+
+def object_rows(queryset):
+    """Строки для CompactObjectSerializer: словари из .values() вместо моделей."""
+    return queryset.annotate(lng=StX('coordinates'), lat=StY('coordinates')).values(*COMPACT_OBJECT_FIELDS)
+
+
+class CompactObjectSerializer:
+    """
+    Быстрый путь для списка объектов: тот же JSON, что у ObjectSerializer, но без
+    вложенных сериализаторов на каждую строку. Статусы сериализуются один раз из реестра,
+    ответственные — один раз на каждого уникального пользователя страницы.
+    """
+
+    def __init__(self, context=None):
+        self.request = (context or {}).get('request')
+        self.date_field = serializers.DateField()
+        self.datetime_field = serializers.DateTimeField()
+        self.statuses = {status.id: StatusSerializer(status).data for status in status_registry.all()}
+
+    def _status(self, pk):
+        if pk not in self.statuses:
+            # Статуса нет в снимке реестра (создан в другом воркере) — get() перечитает реестр
+            status = status_registry.get(pk)
+            self.statuses[pk] = StatusSerializer(status).data if status else None
+        return self.statuses[pk]
+
+    def _users(self, rows):
+        ids = {row['responsible_id'] for row in rows}
+        users = User.objects.filter(id__in=ids).select_related('role')
+        return {user.id: UserSerializer(user).data for user in users}
+
+    def serialize(self, rows):
+        rows = list(rows)
+        users = self._users(rows)
+        to_date = self.date_field.to_representation
+        to_datetime = self.datetime_field.to_representation
+
+        data = []
+        for row in rows:
+            photo_url = media_url(self.request, Object, row['id'], row['main_photo'])
+            data.append({
+                'id': row['id'],
+                'code': row['code'],
+                'title': row['title'],
+                'address': row['address'],
+                'region': row['region'],
+                'coordinates': [row['lng'], row['lat']] if row['lng'] is not None else None,
+                'description': row['description'],
+                'status': self._status(row['status_id']),
+                'responsible': users.get(row['responsible_id']),
+                'start_date': to_date(row['start_date']) if row['start_date'] else None,
+                'end_date': to_date(row['end_date']) if row['end_date'] else None,
+                'created_at': to_datetime(row['created_at']) if row['created_at'] else None,
+                'updated_at': to_datetime(row['updated_at']) if row['updated_at'] else None,
+                'main_photo': photo_url,
+                'main_photo_url': photo_url,
+                'main_photo_variants': build_media_urls(
+                    self.request, Object, row['id'], variant_names(row['main_photo'], row['main_photo_variants'])
+                ),
+            })
+        return data
@@ -0,0 +1,56 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+from rest_framework import filters
+
+SEARCH_CONFIG = 'russian'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_prefix_query(text):
+    """'светланская 1' -> 'светланская:* & 1:*' — подходит для поиска по мере набора."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), config=SEARCH_CONFIG, search_type='raw')
+
+
+class ObjectSearchFilter(filters.SearchFilter):
+    """
+    Параметр ?search= поверх search_vector (tsvector, GIN) и pg_trgm вместо цепочки
+    ILIKE '%...%' по пяти колонкам. Адрес сравнивается по word_similarity (оператор %>, допускает
+    опечатки), код — по подстроке через триграммный индекс.
+    Результат аннотируется search_rank.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = ' '.join(self.get_search_terms(request))
+        if not text:
+            return queryset
+
+        query = build_prefix_query(text)
+        condition = Q(address__trigram_word_similar=text) | Q(code__icontains=text)
+        if query is not None:
+            condition |= Q(search_vector=query)
+            rank = SearchRank(F('search_vector'), query) + TrigramWordSimilarity(text, 'address')
+        else:
+            rank = TrigramWordSimilarity(text, 'address')
+
+        return queryset.filter(condition).annotate(search_rank=rank)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        for parameter in parameters:
+            parameter['description'] = 'Полнотекстовый и нечёткий поиск по коду, названию, адресу, району и описанию'
+        return parameters
+
+
+class ObjectOrderingFilter(filters.OrderingFilter):
+    """При поиске без явного ?ordering= сортирует по релевантности."""
+
+    def get_default_ordering(self, view):
+        search = view.request.query_params.get(filters.SearchFilter.search_param, '')
+        if search.strip():
+            return ['-search_rank', '-created_at']
+        return super().get_default_ordering(view)
@@ -0,0 +1,180 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Сортировка по умолчанию для курсорной пагинации; поле id делает ключ уникальным
+DEFAULT_KEYSET_ORDERING = ('-created_at', '-id')
+
+
+def wants_keyset(request):
+    params = request.query_params
+    return params.get('pagination') == 'cursor' or 'cursor' in params
+
+
+def wants_count(request):
+    return request.query_params.get('count', 'true').lower() not in ('0', 'false', 'no')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (created_at, id): следующая страница выбирается условием
+    WHERE (created_at, id) < (курсор), поэтому стоит столько же, сколько первая.
+    COUNT(*) не выполняется.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def __init__(self, ordering=DEFAULT_KEYSET_ORDERING, page_size=None):
+        from django.conf import settings
+
+        self.ordering = ordering
+        self.page_size = page_size or settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, instance):
+        # Страница может состоять из моделей или из словарей .values()
+        if isinstance(instance, dict):
+            values = [instance[field.lstrip('-')] for field in self.ordering]
+        else:
+            values = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            key_value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(key_value), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound('Неверный курсор')
+
+    def filter_after(self, queryset, cursor):
+        key_field, pk_field = (field.lstrip('-') for field in self.ordering)
+        key_value, pk = self.decode_cursor(cursor)
+        lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        # Первое условие — диапазон по индексу, второе отсекает строки с тем же created_at
+        return queryset.filter(**{f'{key_field}__{lookup}e': key_value}).filter(
+            Q(**{f'{key_field}__{lookup}': key_value}) | Q(**{f'{pk_field}__{lookup}': pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering_param = request.query_params.get('ordering')
+        if ordering_param and ordering_param != self.ordering[0]:
+            raise ValidationError({
+                'ordering': 'Курсорная пагинация поддерживает только сортировку по умолчанию'
+            })
+
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self.filter_after(queryset, cursor)
+
+        page = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(page) > self.page_size_value
+        page = page[:self.page_size_value]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('next_cursor', self.next_cursor),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class OptionalCountPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация; с ?count=false не выполняет COUNT(*)."""
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if wants_count(request):
+            self.without_count = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.without_count = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = max(1, int(request.query_params.get(self.page_query_param, 1)))
+        except ValueError:
+            raise NotFound('Неверный номер страницы')
+
+        offset = (self.page_number - 1) * page_size
+        page = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(page) > page_size
+        return page[:page_size]
+
+    def get_paginated_response(self, data):
+        if not self.without_count:
+            return super().get_paginated_response(data)
+
+        url = self.request.build_absolute_uri()
+        next_link = replace_query_param(url, self.page_query_param, self.page_number + 1) if self.has_next else None
+        if self.page_number <= 1:
+            previous_link = None
+        elif self.page_number == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        else:
+            previous_link = replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+        return Response(OrderedDict([
+            ('next', next_link),
+            ('previous', previous_link),
+            ('results', data),
+        ]))
+
+
+class SelectablePagination(BasePagination):
+    """
+    Выбор пагинации на уровне запроса: ?pagination=cursor (или ?cursor=...) — по ключу,
+    иначе постраничная, как раньше. Ключ сортировки берётся из view.keyset_ordering.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if wants_keyset(request):
+            ordering = getattr(view, 'keyset_ordering', DEFAULT_KEYSET_ORDERING)
+            self.delegate = KeysetPagination(ordering)
+        else:
+            self.delegate = OptionalCountPageNumberPagination()
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return OptionalCountPageNumberPagination().get_paginated_response_schema(schema)
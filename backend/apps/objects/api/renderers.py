@@ -0,0 +1,109 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.contrib.gis.geos import GEOSGeometry, Point
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Разделители строк U+2028/U+2029 допустимы в JSON, но не в JavaScript — экранируем, как DRF
+LINE_SEPARATORS = (('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
+
+def _geometry(value):
+    # Точка — [lng, lat], как coordinates в ObjectSerializer; прочие геометрии — GeoJSON
+    if isinstance(value, Point):
+        return [value.x, value.y]
+    return json.loads(value.geojson)
+
+
+def encode_value(value):
+    """Значения, которые не умеют кодировать orjson и msgpack: всё остальное — как в DRF."""
+    if isinstance(value, datetime):
+        representation = value.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, GEOSGeometry):
+        return _geometry(value)
+    return encoders.JSONEncoder().default(value)
+
+
+class APIJSONEncoder(encoders.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, GEOSGeometry):
+            return _geometry(obj)
+        return super().default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON через orjson, если он установлен; иначе — стандартный json с тем же выводом.
+    Даты и время orjson кодирует сам (UTC с суффиксом Z, как DRF).
+    """
+    encoder_class = APIJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=encode_value, option=option)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """MessagePack для внутренних клиентов (Accept: application/msgpack). Требует пакет msgpack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_value, use_bin_type=True, datetime=False)
+
+
+class MVTRenderer(renderers.BaseRenderer):
+    media_type = 'application/vnd.mapbox-vector-tile'
+    format = 'pbf'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Ошибки отдаются только кодом ответа: клиент карты тело всё равно не читает
+        if isinstance(data, bytes):
+            return data
+        return b''
+
+
+class GeoJSONRenderer(FastJSONRenderer):
+    media_type = 'application/geo+json'
+    format = 'geojson'
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -1,21 +1,51 @@
 from rest_framework import serializers
 from django.contrib.gis.geos import Point
 from ..models import Status, Object, History, Comment, CommentPhoto
+from ..registry import status_registry
+from ..suggest import SUGGEST_FIELDS, SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
+from ..importers import IMPORT_FORMATS, detect_format
+from ..images import schedule_processing, validate_image_upload, variant_names
+from ..uploads import delete_unreferenced_files, store_files
+from ..media import build_media_urls, media_url
 from ...users.models import User
 from ...users.api.serializers import UserSerializer
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
 import json
 
+
+class MediaImageField(serializers.ImageField):
+    """ImageField, который отдаёт ссылку на MediaFileView вместо публичного /media/."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return media_url(self.context.get('request'), type(value.instance), value.instance.pk, value.name)
+
+
 class StatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = Status
-        fields = ['id', 'name', 'color', 'description', 'order', 'is_active']
+        fields = ['id', 'name', 'color', 'description', 'order', 'is_active', 'category']
+
+
+class RegistryStatusField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        status = status_registry.get(data)
+        if status is None:
+            self.fail('does_not_exist', pk_value=data)
+        return status
 
 
 class ObjectSerializer(serializers.ModelSerializer):
     status = StatusSerializer(read_only=True)
     responsible = UserSerializer(read_only=True)
 
-    status_id = serializers.PrimaryKeyRelatedField(
+    status_id = RegistryStatusField(
         queryset=Status.objects.all(),
         source='status',
         write_only=True,
@@ -36,8 +66,9 @@ class ObjectSerializer(serializers.ModelSerializer):
         help_text="Формат: [долгота, широта] или строка '[lng, lat]'"
     )
 
-    main_photo = serializers.ImageField(required=False, allow_null=True)
+    main_photo = MediaImageField(required=False, allow_null=True, validators=[validate_image_upload])
     main_photo_url = serializers.SerializerMethodField(read_only=True)
+    main_photo_variants = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Object
@@ -46,9 +77,9 @@ class ObjectSerializer(serializers.ModelSerializer):
             'coordinates_input', 'description', 'status', 'status_id',
             'responsible', 'responsible_id', 'start_date', 'end_date',
             'created_at', 'updated_at',
-            'main_photo', 'main_photo_url'
+            'main_photo', 'main_photo_url', 'main_photo_variants'
         ]
-        read_only_fields = ['id', 'code', 'created_at', 'updated_at', 'main_photo_url']
+        read_only_fields = ['id', 'code', 'created_at', 'updated_at', 'main_photo_url', 'main_photo_variants']
 
     def get_coordinates(self, obj):
         if obj.coordinates:
@@ -56,12 +87,11 @@ class ObjectSerializer(serializers.ModelSerializer):
         return None
 
     def get_main_photo_url(self, obj):
-        if obj.main_photo and hasattr(obj.main_photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.main_photo.url)
-            return obj.main_photo.url
-        return None
+        return media_url(self.context.get('request'), Object, obj.pk, obj.main_photo.name)
+
+    def get_main_photo_variants(self, obj):
+        names = variant_names(obj.main_photo.name, obj.main_photo_variants)
+        return build_media_urls(self.context.get('request'), Object, obj.pk, names)
 
     def validate_coordinates_input(self, value):
         if isinstance(value, str):
@@ -103,11 +133,6 @@ class ObjectSerializer(serializers.ModelSerializer):
         if coords:
             validated_data['coordinates'] = Point(coords[0], coords[1], srid=4326)
 
-        if not validated_data.get('code'):
-            last_object = Object.objects.all().order_by('-id').first()
-            next_id = (last_object.id if last_object else 0) + 1
-            validated_data['code'] = f'OBJ-{next_id:05d}'
-
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
@@ -117,6 +142,100 @@ class ObjectSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+# Сколько объектов можно перевести в другой статус одним запросом
+BULK_STATUS_MAX_IDS = 1000
+
+
+class BulkStatusUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_STATUS_MAX_IDS
+    )
+    status_id = RegistryStatusField(queryset=Status.objects.all())
+
+    def validate_status_id(self, value):
+        if not value.is_active:
+            raise serializers.ValidationError('Статус не найден или неактивен')
+        return value
+
+
+class MapQuerySerializer(serializers.Serializer):
+    bbox = serializers.CharField(
+        required=False,
+        help_text="Формат: minLng,minLat,maxLng,maxLat"
+    )
+    zoom = serializers.IntegerField(required=False, min_value=0, max_value=22)
+
+    def validate_bbox(self, value):
+        try:
+            min_lng, min_lat, max_lng, max_lat = [float(part) for part in value.split(',')]
+        except ValueError:
+            raise serializers.ValidationError(
+                "Неверный формат bbox. Ожидалось: minLng,minLat,maxLng,maxLat"
+            )
+
+        if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+            raise serializers.ValidationError("Долгота должна быть в диапазоне от -180 до 180")
+        if not (-90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+            raise serializers.ValidationError("Широта должна быть в диапазоне от -90 до 90")
+        if min_lng > max_lng or min_lat > max_lat:
+            raise serializers.ValidationError("Минимальные координаты bbox больше максимальных")
+
+        return (min_lng, min_lat, max_lng, max_lat)
+
+
+class ClusterQuerySerializer(MapQuerySerializer):
+    zoom = serializers.IntegerField(min_value=0, max_value=22)
+
+
+class SuggestQuerySerializer(serializers.Serializer):
+    field = serializers.ChoiceField(choices=SUGGEST_FIELDS)
+    q = serializers.CharField(max_length=200, trim_whitespace=True)
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=SUGGEST_MAX_LIMIT,
+        default=SUGGEST_DEFAULT_LIMIT
+    )
+
+
+class ObjectImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(
+        choices=IMPORT_FORMATS,
+        required=False,
+        help_text="По умолчанию определяется по расширению файла"
+    )
+    dry_run = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if not data.get('format'):
+            data['format'] = detect_format(data['file'].name)
+            if not data['format']:
+                raise serializers.ValidationError({
+                    'format': f"Не удалось определить формат файла. Доступно: {', '.join(IMPORT_FORMATS)}"
+                })
+        return data
+
+
+class AsOfQuerySerializer(serializers.Serializer):
+    t = serializers.CharField(help_text="Дата и время ISO 8601; для даты без времени — состояние на конец дня")
+
+    def validate_t(self, value):
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise serializers.ValidationError(
+                    "Неверный формат. Ожидалось: ГГГГ-ММ-ДД или ГГГГ-ММ-ДДTЧЧ:ММ[:СС]"
+                )
+            moment = datetime.combine(day, time.max)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+
 class HistorySerializer(serializers.ModelSerializer):
     changed_by = UserSerializer(read_only=True)
     new_status_color = serializers.SerializerMethodField()
@@ -124,8 +243,9 @@ class HistorySerializer(serializers.ModelSerializer):
 
     def get_new_status_color(self, obj):
         if obj.field_name == 'status' and obj.new_value:
-            status = Status.objects.filter(name=obj.new_value).first()
-            return status.color if status else None
+            if hasattr(obj, 'status_color'):
+                return obj.status_color
+            return status_registry.color_for(obj.new_value)
         return None
 
     class Meta:
@@ -135,19 +255,20 @@ class HistorySerializer(serializers.ModelSerializer):
 
 
 class CommentPhotoSerializer(serializers.ModelSerializer):
+    photo = MediaImageField(read_only=True)
     photo_url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
 
     def get_photo_url(self, obj):
-        if obj.photo and hasattr(obj.photo, 'url'):
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.photo.url)
-            return obj.photo.url
-        return None
+        return media_url(self.context.get('request'), CommentPhoto, obj.pk, obj.photo.name)
+
+    def get_variants(self, obj):
+        names = variant_names(obj.photo.name, obj.variants)
+        return build_media_urls(self.context.get('request'), CommentPhoto, obj.pk, names)
 
     class Meta:
         model = CommentPhoto
-        fields = ['id', 'photo', 'photo_url', 'uploaded_at']
+        fields = ['id', 'photo', 'photo_url', 'variants', 'uploaded_at']
         read_only_fields = ['uploaded_at']
 
 
@@ -155,7 +276,7 @@ class CommentSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     photos = CommentPhotoSerializer(many=True, read_only=True)
     photo_files = serializers.ListField(
-        child=serializers.ImageField(),
+        child=serializers.ImageField(validators=[validate_image_upload]),
         write_only=True,
         required=False
     )
@@ -168,12 +289,23 @@ class CommentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         photo_files = validated_data.pop('photo_files', [])
         validated_data['author'] = self.context['request'].user
-        comment = super().create(validated_data)
 
-        for photo_file in photo_files:
-            CommentPhoto.objects.create(
-                comment=comment,
-                photo=photo_file
-            )
+        # Учёт ссылок на файлы — в одной транзакции с комментарием и фото: при откате
+        # счётчики не остаются, а записанные файлы без ссылок удаляются
+        photo_field = CommentPhoto._meta.get_field('photo')
+        names = []
+        try:
+            with transaction.atomic():
+                names = store_files(photo_field, CommentPhoto(), photo_files)
+                comment = super().create(validated_data)
+                photos = CommentPhoto.objects.bulk_create([
+                    CommentPhoto(comment=comment, photo=name) for name in names
+                ])
+                # bulk_create не отправляет post_save — обработку фото запускаем сами
+                for photo in photos:
+                    schedule_processing(CommentPhoto, photo.pk)
+        except Exception:
+            delete_unreferenced_files(photo_field.storage, names)
+            raise
 
         return comment
\ No newline at end of file
@@ -1,19 +1,46 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from ..models import Status, Object, History, Comment
-from .serializers import StatusSerializer, ObjectSerializer,HistorySerializer, CommentSerializer
-from ...users.permissions import IsAdmin, IsManagerOrAdmin
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.contrib.gis.geos import Polygon
+import hashlib
+from ..models import Status, Object, ObjectStat, History, Comment, CommentPhoto
+from ..functions import StX, StY
+from ..registry import status_registry
+from ..cache import bump_objects_version
+from ..geo import map_coordinate_precision, cluster_objects
+from ..tiles import is_valid_tile, tile_cache_key, get_tile
+from ..export import iter_geojson, iter_ndjson
+from ..suggest import suggestion_index
+from ..importers import ImportFileError, import_objects
+from ..snapshots import objects_state_as_of
+from ..images import PHOTO_FIELDS, photo_files
+from ..media import MEDIA_MODELS, MediaTokenAuthentication, serve_file
+from .compact import CompactObjectSerializer, object_rows
+from .filters import ObjectSearchFilter, ObjectOrderingFilter
+from .pagination import KeysetPagination, SelectablePagination, wants_keyset
+from .renderers import FastJSONRenderer, MVTRenderer, GeoJSONRenderer, NDJSONRenderer
+from .serializers import (
+    StatusSerializer, ObjectSerializer, HistorySerializer, CommentSerializer,
+    MapQuerySerializer, ClusterQuerySerializer, SuggestQuerySerializer, ObjectImportSerializer,
+    BulkStatusUpdateSerializer, AsOfQuerySerializer,
+)
+from ...users.models import Role
+from ...users.permissions import IsAdmin, IsManagerOrAdmin, get_role_code, get_role_scope, scope_queryset
 
 
 class IsCommentOwnerOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        user_role = getattr(request.user, 'role', None)
-        role_name = getattr(user_role, 'name', '') if user_role else ''
-
-        return obj.author == request.user or role_name == 'admin'
+        return obj.author == request.user or get_role_code(request.user) == Role.ADMIN
 
 
 class StatusViewSet(viewsets.ModelViewSet):
@@ -34,28 +61,52 @@ class StatusViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_active=True)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Список отдаётся из реестра статусов, ETag меняется вместе с его версией
+        query_hash = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+        etag = f'"statuses-{status_registry.version}-{query_hash}"'
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+
+        statuses = status_registry.active()
+        ordering = filters.OrderingFilter().get_ordering(request, self.get_queryset(), self)
+        for field in reversed(ordering or []):
+            statuses.sort(key=lambda item: getattr(item, field.lstrip('-')), reverse=field.startswith('-'))
+
+        page = self.paginate_queryset(statuses)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(statuses, many=True).data)
+        response['ETag'] = etag
+        return response
+
+
+# Верхняя граница числа точек в ответе /objects/map/
+MAP_MAX_FEATURES = 10000
+
+# Группировки /objects/stats/: поля сводки object_stats для каждой из них
+STATS_GROUP_FIELDS = {
+    'status': ['status_id', 'status__name', 'status__color'],
+    'region': ['region'],
+    'responsible': ['responsible_id', 'responsible__last_name', 'responsible__first_name'],
+}
+
+
 class ObjectViewSet(viewsets.ModelViewSet):
-    queryset = Object.objects.select_related('status', 'responsible').all()
+    queryset = Object.objects.select_related('status', 'responsible__role').all()
     serializer_class = ObjectSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = SelectablePagination
+    keyset_ordering = ('-created_at', '-id')
+    filter_backends = [DjangoFilterBackend, ObjectSearchFilter, ObjectOrderingFilter]
     filterset_fields = ['status', 'responsible', 'region', 'start_date', 'end_date']
     search_fields = ['title', 'address', 'region', 'code', 'description']
     ordering_fields = ['start_date', 'end_date', 'created_at', 'title']
     ordering = ['-created_at']
 
     def get_queryset(self):
-        user = self.request.user
-        user_role = getattr(user, 'role', None)
-        role_name = getattr(user_role, 'name', '') if user_role else ''
-
-        if role_name in ['admin', 'manager']:
-            return self.queryset
-
-        if role_name == 'master':
-            return self.queryset.filter(responsible=user)
-
-        return self.queryset.none()
+        return scope_queryset(self.queryset, self.request.user)
 
     def get_permissions(self):
         if self.action in ['create', 'destroy']:
@@ -65,19 +116,38 @@ class ObjectViewSet(viewsets.ModelViewSet):
         return [permissions.IsAuthenticated()]
 
 
+    def get_renderers(self):
+        if self.action == 'tiles':
+            return [MVTRenderer()]
+        if self.action == 'export':
+            return [GeoJSONRenderer(), NDJSONRenderer(), FastJSONRenderer()]
+        return super().get_renderers()
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         return context
 
+    def list(self, request, *args, **kwargs):
+        # Список строится из .values() через CompactObjectSerializer — формат тот же, что у ObjectSerializer
+        rows = object_rows(self.filter_queryset(self.get_queryset()))
+        serializer = CompactObjectSerializer(context=self.get_serializer_context())
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
+
+    def perform_update(self, serializer):
+        serializer.instance._changed_by = self.request.user
+        serializer.save()
+
 
     @action(detail=True, methods=['patch'], permission_classes=[permissions.IsAuthenticated])
     def update_status(self, request, pk=None):
         obj = self.get_object()
         user = request.user
-        user_role = getattr(user, 'role', None)
-        role_name = getattr(user_role, 'name', '') if user_role else ''
 
-        if role_name == 'master' and obj.responsible != user:
+        if get_role_code(user) == Role.MASTER and obj.responsible_id != user.id:
             return Response(
                 {'error': 'Нет прав для изменения статуса этого объекта'},
                 status=status.HTTP_403_FORBIDDEN
@@ -87,30 +157,243 @@ class ObjectViewSet(viewsets.ModelViewSet):
         if not status_id:
             return Response({'error': 'Не указан статус'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            new_status = Status.objects.get(id=status_id, is_active=True)
-        except Status.DoesNotExist:
+        new_status = status_registry.get(status_id)
+        if new_status is None or not new_status.is_active:
             return Response({'error': 'Статус не найден или неактивен'}, status=status.HTTP_400_BAD_REQUEST)
 
-        old_status_name = obj.status.name if obj.status else None
-
         obj.status = new_status
+        # Запись в History делает FieldHistoryMixin.save()
+        obj._changed_by = user
         obj.save(update_fields=['status', 'updated_at'])
 
-        History.objects.create(
-            object=obj,
-            changed_by=user,
-            field_name='status',
-            old_value=old_status_name,
-            new_value=new_status.name
+        return Response(ObjectSerializer(obj, context={'request': request}).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def bulk_update_status(self, request):
+        serializer = BulkStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status_id']
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+
+        with transaction.atomic():
+            # get_queryset() ограничивает мастера своими объектами — чужие id попадут в not_found
+            current = dict(
+                self.get_queryset().filter(id__in=ids)
+                .select_for_update()
+                .values_list('id', 'status_id')
+            )
+            changed = [pk for pk, status_id in current.items() if status_id != new_status.id]
+
+            if changed:
+                Object.objects.filter(id__in=changed).update(status=new_status, updated_at=timezone.now())
+                History.objects.bulk_create([
+                    History(
+                        object_id=pk,
+                        changed_by=request.user,
+                        field_name='status',
+                        old_value=getattr(status_registry.get(current[pk]), 'name', None),
+                        new_value=new_status.name
+                    )
+                    for pk in changed
+                ])
+                # queryset.update() не отправляет post_save
+                transaction.on_commit(bump_objects_version)
+
+        return Response({
+            'status_id': new_status.id,
+            'requested': len(ids),
+            'updated': len(changed),
+            'unchanged': len(current) - len(changed),
+            'not_found': [pk for pk in ids if pk not in current],
+        })
+
+    @action(detail=False, methods=['get'], url_path='map', url_name='map',
+            permission_classes=[permissions.IsAuthenticated])
+    def map_objects(self, request):
+        params = MapQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        bbox = params.validated_data.get('bbox')
+        precision = map_coordinate_precision(params.validated_data.get('zoom'))
+
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        if bbox:
+            envelope = Polygon.from_bbox(bbox)
+            envelope.srid = 4326
+            # && по GiST-индексу coordinates
+            queryset = queryset.filter(coordinates__bboverlaps=envelope)
+
+        rows = list(
+            queryset.annotate(
+                lng=StX('coordinates'),
+                lat=StY('coordinates'),
+            ).values_list('id', 'lng', 'lat', 'status_id', 'code')[:MAP_MAX_FEATURES + 1]
+        )
+        truncated = len(rows) > MAP_MAX_FEATURES
+
+        return Response({
+            'count': min(len(rows), MAP_MAX_FEATURES),
+            'truncated': truncated,
+            'results': [
+                {
+                    'id': pk,
+                    'lng': round(lng, precision),
+                    'lat': round(lat, precision),
+                    'status_id': status_id,
+                    'code': code,
+                }
+                for pk, lng, lat, status_id, code in rows[:MAP_MAX_FEATURES]
+            ],
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def clusters(self, request):
+        params = ClusterQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        bbox = params.validated_data.get('bbox')
+        zoom = params.validated_data['zoom']
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if bbox:
+            envelope = Polygon.from_bbox(bbox)
+            envelope.srid = 4326
+            queryset = queryset.filter(coordinates__bboverlaps=envelope)
+
+        cell_size, clusters = cluster_objects(queryset, zoom, bbox)
+        return Response({
+            'zoom': zoom,
+            'cell_size': cell_size,
+            'count': sum(cluster['count'] for cluster in clusters),
+            'clusters': clusters,
+        })
+
+    def tiles(self, request, z, x, y):
+        # Подключается в urls.py как objects/tiles/<z>/<x>/<y>.pbf
+        if not is_valid_tile(z, x, y):
+            raise ValidationError('Тайл вне допустимого диапазона')
+
+        scope = get_role_scope(request.user)
+        cache_key = tile_cache_key(z, x, y, scope, request.query_params)
+        etag = f'"{hashlib.md5(cache_key.encode()).hexdigest()}"'
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+
+        tile = get_tile(self.filter_queryset(self.get_queryset()), z, x, y, cache_key)
+        response = HttpResponse(tile, content_type=MVTRenderer.media_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=60'
+        return response
+
+    def export(self, request, export_format='geojson'):
+        # Подключается в urls.py как objects/export.geojson и objects/export.ndjson
+        queryset = self.filter_queryset(self.get_queryset())
+        if export_format == 'ndjson':
+            response = StreamingHttpResponse(iter_ndjson(queryset), content_type=NDJSONRenderer.media_type)
+        else:
+            response = StreamingHttpResponse(iter_geojson(queryset), content_type=GeoJSONRenderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="objects.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def stats(self, request):
+        group_by = request.query_params.get('group_by', 'status')
+        if group_by not in STATS_GROUP_FIELDS:
+            return Response(
+                {'error': f"Недопустимая группировка. Доступно: {', '.join(STATS_GROUP_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Читаем поддерживаемую триггерами сводку вместо COUNT по всей таблице objects
+        queryset = scope_queryset(ObjectStat.objects.filter(count__gt=0), request.user)
+
+        for param in ['status', 'responsible', 'region']:
+            value = request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+
+        fields = STATS_GROUP_FIELDS[group_by]
+        rows = list(
+            queryset.order_by().values(*fields).annotate(count=Sum('count')).order_by(fields[0])
         )
+        return Response({
+            'group_by': group_by,
+            'total': sum(row['count'] for row in rows),
+            'results': rows,
+        })
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[permissions.IsAuthenticated, IsManagerOrAdmin])
+    def suggest(self, request):
+        # Подсказки для форм создания/редактирования — из индекса в памяти, без запроса к objects
+        params = SuggestQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        field = params.validated_data['field']
+        query = params.validated_data['q']
+
+        return Response({
+            'field': field,
+            'q': query,
+            'results': suggestion_index.suggest(field, query, params.validated_data['limit']),
+        })
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import',
+            permission_classes=[permissions.IsAuthenticated, IsAdmin],
+            parser_classes=[MultiPartParser])
+    def import_objects(self, request):
+        serializer = ObjectImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        return Response(ObjectSerializer(obj, context={'request': request}).data)
+        try:
+            summary = import_objects(
+                serializer.validated_data['file'],
+                serializer.validated_data['format'],
+                dry_run=serializer.validated_data['dry_run'],
+            )
+        except ImportFileError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(summary)
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def as_of(self, request, pk=None):
+        obj = self.get_object()
+        params = AsOfQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        moment = params.validated_data['t']
+
+        state = objects_state_as_of([obj.pk], moment).get(obj.pk)
+        if state is None:
+            raise NotFound('На указанный момент объект ещё не был создан')
+        return Response({'as_of': moment, **state})
+
+    @action(detail=False, methods=['get'], url_path='as_of', url_name='as-of-bulk',
+            permission_classes=[permissions.IsAuthenticated])
+    def as_of_bulk(self, request):
+        params = AsOfQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        moment = params.validated_data['t']
+
+        # Фильтры и пагинация — как у списка, но только по объектам, существовавшим на момент t
+        queryset = self.filter_queryset(self.get_queryset()).filter(created_at__lte=moment).only('id', 'created_at')
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+        states = objects_state_as_of([obj.pk for obj in objects], moment)
+        results = [states[obj.pk] for obj in objects if obj.pk in states]
+
+        if page is not None:
+            response = self.get_paginated_response(results)
+            response.data['as_of'] = moment
+            return response
+        return Response({'as_of': moment, 'results': results})
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def history(self, request, pk=None):
         obj = self.get_object()
-        history = obj.history.select_related('changed_by').all()
+        history = obj.history.select_related('changed_by__role').with_status_color()
+        # По умолчанию — весь список, как раньше; ?pagination=cursor включает пагинацию по ключу
+        if wants_keyset(request):
+            paginator = KeysetPagination(ordering=('-changed_at', '-id'))
+            page = paginator.paginate_queryset(history, request, self)
+            return paginator.get_paginated_response(HistorySerializer(page, many=True).data)
         serializer = HistorySerializer(history, many=True)
         return Response(serializer.data)
 
@@ -118,6 +401,12 @@ class ObjectViewSet(viewsets.ModelViewSet):
     def comments(self, request, pk=None):
         obj = self.get_object()
         comments = obj.comments.select_related('author').prefetch_related('photos').all()
+        if wants_keyset(request):
+            paginator = KeysetPagination(ordering=('-created_at', '-id'))
+            page = paginator.paginate_queryset(comments, request, self)
+            return paginator.get_paginated_response(
+                CommentSerializer(page, many=True, context={'request': request}).data
+            )
         serializer = CommentSerializer(
             comments,
             many=True,
@@ -129,19 +418,11 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.select_related('author', 'object').prefetch_related('photos').all()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SelectablePagination
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        user = self.request.user
-        user_role = getattr(user, 'role', None)
-        role_name = getattr(user_role, 'name', '') if user_role else ''
-
-        if role_name in ['admin', 'manager']:
-            return self.queryset
-
-        if role_name == 'master':
-            return self.queryset.filter(object__responsible=user)
-
-        return self.queryset.none()
+        return scope_queryset(self.queryset, self.request.user, 'object__responsible')
 
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
@@ -151,4 +432,28 @@ class CommentViewSet(viewsets.ModelViewSet):
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
-        return context
\ No newline at end of file
+        return context
+
+
+class MediaFileView(APIView):
+    """
+    Фото объектов и комментариев с проверкой доступа: те же правила, что у ObjectViewSet
+    и CommentViewSet. Из <img> пользователь определяется по токену в ссылке.
+    """
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, MediaTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self, model):
+        responsible_field = 'comment__object__responsible' if model is CommentPhoto else 'responsible'
+        return scope_queryset(model.objects.all(), self.request.user, responsible_field)
+
+    def get(self, request, kind, pk, name):
+        model = MEDIA_MODELS.get(kind)
+        if model is None:
+            raise NotFound()
+        instance = get_object_or_404(self.get_queryset(model), pk=pk)
+        # Ссылка действительна только для текущего фото записи и его вариантов
+        if name not in photo_files(instance):
+            raise NotFound()
+        storage = model._meta.get_field(PHOTO_FIELDS[model][0]).storage
+        return serve_file(request, storage, name)
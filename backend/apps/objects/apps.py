@@ -4,4 +4,12 @@ from django.apps import AppConfig
 class ObjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.objects'
-    verbose_name = 'Объекты'
\ No newline at end of file
+    verbose_name = 'Объекты'
+
+    def ready(self):
+        from django.db.models.signals import pre_migrate, post_migrate
+        from . import signals, sql
+
+        post_migrate.connect(signals.assign_default_status_categories, sender=self)
+        pre_migrate.connect(sql.install_prerequisites, sender=self)
+        post_migrate.connect(sql.install_database_objects, sender=self)
@@ -0,0 +1,28 @@
+import time
+from django.core.cache import cache
+
+OBJECTS_VERSION_KEY = 'objects:version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Начальное значение — метка времени: после очистки кеша версии не повторяются
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return get_version(key)
+
+
+def get_objects_version():
+    return get_version(OBJECTS_VERSION_KEY)
+
+
+def bump_objects_version():
+    return bump_version(OBJECTS_VERSION_KEY)
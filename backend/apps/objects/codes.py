@@ -0,0 +1,28 @@
+import re
+from django.db import connections
+
+OBJECT_CODE_SEQUENCE = 'objects_code_seq'
+OBJECT_CODE_PREFIX = 'OBJ-'
+# Не меньше 5 цифр, как у кодов OBJ-00001, и без обрезания длинных номеров
+OBJECT_CODE_NUMBER_FORMAT = 'FM99999999999900000'
+OBJECT_CODE_PATTERN = re.compile(rf'^{re.escape(OBJECT_CODE_PREFIX)}([0-9]+)$')
+
+# Последовательность только растёт: setval, если номер не меньше следующего выдаваемого
+ADVANCE_OBJECT_CODE_SEQUENCE_SQL = f"""
+    SELECT setval('{OBJECT_CODE_SEQUENCE}', %s)
+    WHERE %s >= (
+        SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END FROM {OBJECT_CODE_SEQUENCE}
+    )
+"""
+
+
+def advance_object_code_sequence(codes, using='default'):
+    """
+    Продвигает objects_code_seq за явно заданные коды вида OBJ-00120 (например, из файла
+    импорта), чтобы DEFAULT не выдал такой же код следующему объекту.
+    """
+    numbers = [int(match.group(1)) for match in map(OBJECT_CODE_PATTERN.match, filter(None, codes)) if match]
+    if not numbers:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(ADVANCE_OBJECT_CODE_SEQUENCE_SQL, [max(numbers), max(numbers)])
@@ -0,0 +1,74 @@
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .functions import StX, StY
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = (
+    'id', 'lng', 'lat', 'code', 'title', 'address', 'region', 'description',
+    'status_id', 'status__name', 'status__color',
+    'responsible_id', 'responsible__username',
+    'start_date', 'end_date', 'created_at', 'updated_at',
+)
+
+
+def _iter_rows(queryset):
+    # values_list + iterator(): серверный курсор PostgreSQL, без моделей и вложенных сериализаторов
+    return (
+        queryset.order_by('id')
+        .annotate(lng=StX('coordinates'), lat=StY('coordinates'))
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def _dump_feature(row):
+    (pk, lng, lat, code, title, address, region, description,
+     status_id, status_name, status_color, responsible_id, responsible_username,
+     start_date, end_date, created_at, updated_at) = row
+    return json.dumps({
+        'type': 'Feature',
+        'id': pk,
+        'geometry': {'type': 'Point', 'coordinates': [lng, lat]},
+        'properties': {
+            'code': code,
+            'title': title,
+            'address': address,
+            'region': region,
+            'description': description,
+            'status_id': status_id,
+            'status': status_name,
+            'status_color': status_color,
+            'responsible_id': responsible_id,
+            'responsible': responsible_username,
+            'start_date': start_date,
+            'end_date': end_date,
+            'created_at': created_at,
+            'updated_at': updated_at,
+        },
+    }, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def iter_geojson(queryset):
+    yield '{"type": "FeatureCollection", "features": [\n'
+    separator = ''
+    chunk = []
+    for row in _iter_rows(queryset):
+        chunk.append(separator + _dump_feature(row))
+        separator = ',\n'
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append('\n]}\n')
+    yield ''.join(chunk)
+
+
+def iter_ndjson(queryset):
+    chunk = []
+    for row in _iter_rows(queryset):
+        chunk.append(_dump_feature(row) + '\n')
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
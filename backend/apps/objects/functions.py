@@ -0,0 +1,24 @@
+from django.db.models import CharField, FloatField, Func
+from .codes import OBJECT_CODE_NUMBER_FORMAT, OBJECT_CODE_PREFIX, OBJECT_CODE_SEQUENCE
+
+
+class StX(Func):
+    function = 'ST_X'
+    output_field = FloatField()
+
+
+class StY(Func):
+    function = 'ST_Y'
+    output_field = FloatField()
+
+
+class NextObjectCode(Func):
+    """'OBJ-' || номер из последовательности objects_code_seq — DEFAULT для objects.code."""
+    template = "('%(prefix)s' || to_char(nextval('%(sequence)s'), '%(number_format)s'))"
+    output_field = CharField()
+
+    def __init__(self, **extra):
+        extra.setdefault('prefix', OBJECT_CODE_PREFIX)
+        extra.setdefault('sequence', OBJECT_CODE_SEQUENCE)
+        extra.setdefault('number_format', OBJECT_CODE_NUMBER_FORMAT)
+        super().__init__(**extra)
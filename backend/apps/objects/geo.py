@@ -0,0 +1,77 @@
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import Floor
+from .functions import StX, StY
+
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+
+# Ячейка кластера — четверть тайла 256px, т.е. 64px на экране
+CLUSTER_CELLS_PER_TILE = 4
+# Не больше CLUSTER_GRID_LIMIT ячеек по каждой стороне bbox, чтобы ответ оставался ограниченным
+CLUSTER_GRID_LIMIT = 20
+
+
+def map_coordinate_precision(zoom):
+    """Число знаков после запятой, достаточное для точности в один пиксель на данном зуме."""
+    if zoom is None:
+        return 6
+    degrees_per_pixel = 360 / (256 * 2 ** zoom)
+    precision = 0
+    while degrees_per_pixel < 1 and precision < 7:
+        degrees_per_pixel *= 10
+        precision += 1
+    return max(precision, 1)
+
+
+def cluster_cell_size(zoom, bbox=None):
+    min_lng, min_lat, max_lng, max_lat = bbox or WORLD_BBOX
+    span = max(max_lng - min_lng, max_lat - min_lat)
+    return max(360 / (2 ** zoom * CLUSTER_CELLS_PER_TILE), span / CLUSTER_GRID_LIMIT)
+
+
+def cluster_objects(queryset, zoom, bbox=None):
+    """
+    Сеточная кластеризация (аналог ST_SnapToGrid): точки группируются по ячейкам
+    одним GROUP BY, в Python остаётся только свести статусы внутри ячейки.
+    """
+    size = cluster_cell_size(zoom, bbox)
+    precision = map_coordinate_precision(zoom)
+
+    rows = (
+        queryset.order_by()
+        .annotate(lng=StX('coordinates'), lat=StY('coordinates'))
+        .annotate(cell_x=Floor(F('lng') / size), cell_y=Floor(F('lat') / size))
+        .values('cell_x', 'cell_y', 'status_id')
+        .annotate(
+            count=Count('id'),
+            sum_lng=Sum('lng'),
+            sum_lat=Sum('lat'),
+            first_id=Min('id'),
+        )
+    )
+
+    cells = {}
+    for row in rows:
+        cell = cells.setdefault((row['cell_x'], row['cell_y']), {
+            'count': 0,
+            'sum_lng': 0.0,
+            'sum_lat': 0.0,
+            'first_id': row['first_id'],
+            'statuses': {},
+        })
+        cell['count'] += row['count']
+        cell['sum_lng'] += row['sum_lng']
+        cell['sum_lat'] += row['sum_lat']
+        cell['first_id'] = min(cell['first_id'], row['first_id'])
+        cell['statuses'][row['status_id']] = row['count']
+
+    return size, [
+        {
+            'lng': round(cell['sum_lng'] / cell['count'], precision),
+            'lat': round(cell['sum_lat'] / cell['count'], precision),
+            'count': cell['count'],
+            'statuses': cell['statuses'],
+            # одиночную точку клиент может сразу показать как обычный маркер
+            'id': cell['first_id'] if cell['count'] == 1 else None,
+        }
+        for cell in cells.values()
+    ]
@@ -0,0 +1,186 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps, features
+from rest_framework import serializers
+from .models import Object, CommentPhoto
+
+logger = logging.getLogger(__name__)
+
+# Модель -> (поле фото, поле с именами вариантов)
+PHOTO_FIELDS = {
+    Object: ('main_photo', 'main_photo_variants'),
+    CommentPhoto: ('photo', 'variants'),
+}
+
+# Длинная сторона оригинала после нормализации, px
+IMAGE_MAX_SIDE = 2560
+# Варианты для карты и ленты комментариев: имя -> длинная сторона, px
+IMAGE_VARIANTS = {'medium': 1280, 'thumb': 320}
+IMAGE_QUALITY = 82
+IMAGE_MAX_UPLOAD_SIZE = 25 * 1024 * 1024
+# Форматы, в которых оригинал пересохраняется как есть; остальные — в JPEG
+NORMALIZED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+EXIF_ORIENTATION = 0x0112
+
+if features.check('webp'):
+    VARIANT_FORMAT = 'WEBP'
+else:
+    VARIANT_FORMAT = 'JPEG'
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2),
+    thread_name_prefix='images',
+)
+
+
+def validate_image_upload(file):
+    if file is not None and file.size > IMAGE_MAX_UPLOAD_SIZE:
+        raise serializers.ValidationError(
+            f'Размер фото не должен превышать {IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)} МБ'
+        )
+
+
+def variant_names(name, variants):
+    """
+    Имена файлов вариантов фото: {вариант: имя}. Пока варианты не построены
+    (или построить их не удалось), вместо них отдаётся оригинал.
+    """
+    if not name:
+        return None
+    variants = variants or {}
+    ready = variants.get('source') == name
+    return {
+        variant: variants[variant] if ready and variant in variants else name
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def photo_files(instance):
+    """Все файлы фото записи: оригинал и варианты."""
+    field_name, variants_field = PHOTO_FIELDS[type(instance)]
+    name = getattr(instance, field_name).name
+    variants = getattr(instance, variants_field) or {}
+    names = [variants[key] for key in IMAGE_VARIANTS if key in variants]
+    if name:
+        names.append(name)
+    return names
+
+
+def needs_processing(name, variants):
+    return (variants or {}).get('source', '') != (name or '')
+
+
+def _with_extension(name, image_format, suffix=''):
+    root, _ = os.path.splitext(name)
+    return f'{root}{suffix}.{NORMALIZED_FORMATS[image_format]}'
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = {'quality': IMAGE_QUALITY, 'optimize': True, 'progressive': True}
+    else:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.mode in ('LA', 'P', 'PA') else 'RGB')
+        options = {'quality': IMAGE_QUALITY, 'method': 4} if image_format == 'WEBP' else {'optimize': True}
+
+    output = io.BytesIO()
+    image.save(output, image_format, **options)
+    return ContentFile(output.getvalue())
+
+
+def _load(storage, name):
+    """Открывает фото, поворачивает по EXIF и уменьшает до IMAGE_MAX_SIDE. Возвращает (фото, формат, изменилось ли)."""
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        image_format = image.format
+        oversized = max(image.size) > IMAGE_MAX_SIDE
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+        # JPEG декодируется сразу в уменьшенном масштабе (не меньше IMAGE_MAX_SIDE) — в разы быстрее
+        image.draft('RGB', (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+        image = ImageOps.exif_transpose(image)
+
+    if oversized:
+        image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+    return image, image_format, oversized or rotated
+
+
+def _build(storage, name, created):
+    image, image_format, changed = _load(storage, name)
+
+    if changed:
+        image_format = image_format if image_format in NORMALIZED_FORMATS else 'JPEG'
+        name = storage.save(_with_extension(name, image_format), _encode(image, image_format))
+        created.append(name)
+
+    variants = {'source': name}
+    directory, filename = os.path.split(name)
+    # От большего варианта к меньшему: каждый уменьшается из предыдущего
+    for variant, side in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+        image.thumbnail((side, side), Image.LANCZOS)
+        variant_name = _with_extension(os.path.join(directory, 'variants', filename), VARIANT_FORMAT, f'_{variant}')
+        variants[variant] = storage.save(variant_name, _encode(image, VARIANT_FORMAT))
+        created.append(variants[variant])
+    return name, variants
+
+
+def process_photo(model, pk):
+    """
+    Нормализует фото записи и строит варианты. Запись обновляется через update(),
+    только если фото за это время не заменили; иначе созданные файлы удаляются.
+    """
+    field_name, variants_field = PHOTO_FIELDS[model]
+    row = model.objects.filter(pk=pk).values_list(field_name, variants_field).first()
+    if row is None:
+        return
+    name, old_variants = row[0] or '', row[1] or {}
+    if not needs_processing(name, old_variants):
+        return
+
+    storage = model._meta.get_field(field_name).storage
+    created = []
+    new_name, variants = name, {'source': name}
+    if name:
+        try:
+            new_name, variants = _build(storage, name, created)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Повреждённый файл: оставляем оригинал, повторно не обрабатываем
+            logger.warning('Не удалось обработать фото %s', name, exc_info=True)
+            for created_name in created:
+                storage.delete(created_name)
+            created = []
+            new_name, variants = name, {'source': name}
+
+    current = Q(**{field_name: name}) if name else Q(**{f'{field_name}__isnull': True}) | Q(**{field_name: ''})
+    updated = model.objects.filter(current, pk=pk).update(**{field_name: new_name or None, variants_field: variants})
+
+    if updated:
+        stale = [old for key, old in old_variants.items() if key != 'source']
+        if new_name != name:
+            stale.append(name)
+    else:
+        stale = created
+    for stale_name in stale:
+        storage.delete(stale_name)
+
+
+def _run(model, pk):
+    try:
+        process_photo(model, pk)
+    except Exception:
+        logger.exception('Не удалось обработать фото %s #%s', model._meta.label, pk)
+    finally:
+        # Обработка идёт в потоке пула — соединение этого потока больше не нужно
+        connection.close()
+
+
+def schedule_processing(model, pk):
+    """Обработка фото в пуле потоков после коммита — запрос её не ждёт."""
+    transaction.on_commit(lambda: _executor.submit(_run, model, pk))
@@ -0,0 +1,450 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from django.contrib.gis.geos import Point
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+from .cache import bump_objects_version
+from .codes import advance_object_code_sequence
+from .models import Object
+from .registry import status_registry
+from ..users.models import User
+
+IMPORT_FORMATS = ('csv', 'xlsx', 'geojson', 'ndjson')
+IMPORT_EXTENSIONS = {
+    '.csv': 'csv',
+    '.xlsx': 'xlsx',
+    '.geojson': 'geojson',
+    '.json': 'geojson',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+IMPORT_BATCH_SIZE = 2000
+# Сколько ошибок по строкам возвращать; остальные только считаются
+IMPORT_MAX_ERRORS = 1000
+# Размер порции при потоковом чтении GeoJSON, символов
+IMPORT_JSON_CHUNK_SIZE = 64 * 1024
+# Больше этого одна фича GeoJSON быть не может (для точек — с огромным запасом)
+IMPORT_JSON_MAX_VALUE_SIZE = 16 * 1024 * 1024
+
+# Заголовки колонок: имена полей и русские названия, как в выгрузках отчётов
+COLUMN_ALIASES = {
+    'code': 'code', 'код': 'code',
+    'title': 'title', 'название': 'title',
+    'address': 'address', 'адрес': 'address',
+    'region': 'region', 'район': 'region',
+    'description': 'description', 'описание': 'description',
+    'status': 'status', 'status_id': 'status', 'статус': 'status',
+    'responsible': 'responsible', 'responsible_id': 'responsible', 'ответственный': 'responsible',
+    'start_date': 'start_date', 'начало работ': 'start_date',
+    'end_date': 'end_date', 'окончание работ': 'end_date',
+    'lng': 'lng', 'долгота': 'lng',
+    'lat': 'lat', 'широта': 'lat',
+    'coordinates': 'coordinates', 'координаты': 'coordinates',
+}
+REQUIRED_COLUMNS = ('title', 'address', 'status', 'responsible', 'start_date', 'end_date')
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+
+
+class ImportFileError(ValueError):
+    """Файл целиком не может быть прочитан: формат, кодировка, нет обязательных колонок."""
+
+
+def detect_format(filename):
+    return IMPORT_EXTENSIONS.get(os.path.splitext(filename or '')[1].lower())
+
+
+def _map_header(header):
+    columns = [COLUMN_ALIASES.get(str(cell).strip().lower()) if cell is not None else None for cell in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    has_coordinates = 'coordinates' in columns or ('lng' in columns and 'lat' in columns)
+    if missing or not has_coordinates:
+        if not has_coordinates:
+            missing.append('lng/lat')
+        raise ImportFileError(f"В файле нет обязательных колонок: {', '.join(missing)}")
+    return columns
+
+
+def iter_csv_rows(file):
+    head = file.read(8192)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(head.decode('utf-8-sig', errors='ignore'), delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text, dialect)
+        header = next(reader, None)
+        if header is None:
+            raise ImportFileError('Файл пуст')
+        columns = _map_header(header)
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield reader.line_num, {key: value for key, value in zip(columns, values) if key}
+    except UnicodeDecodeError:
+        raise ImportFileError('Файл CSV должен быть в кодировке UTF-8')
+    finally:
+        # Не даём обёртке закрыть исходный файл
+        text.detach()
+
+
+def iter_xlsx_rows(file):
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError('Не удалось прочитать файл XLSX')
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFileError('Файл пуст')
+        columns = _map_header(header)
+        for number, values in enumerate(rows, start=2):
+            if all(value is None or value == '' for value in values):
+                continue
+            yield number, {key: value for key, value in zip(columns, values) if key}
+    finally:
+        workbook.close()
+
+
+def _feature_row(feature):
+    if not isinstance(feature, dict):
+        return {}
+    properties = feature.get('properties') or {}
+    row = {COLUMN_ALIASES[key.lower()]: value for key, value in properties.items() if key.lower() in COLUMN_ALIASES}
+    geometry = feature.get('geometry') or {}
+    if geometry.get('type') == 'Point':
+        row['coordinates'] = geometry.get('coordinates')
+    return row
+
+
+class _JSONStream:
+    """Пошаговый разбор JSON из текстового файла: в памяти буфер и одно текущее значение."""
+
+    def __init__(self, text):
+        self.text = text
+        self.chunk_size = IMPORT_JSON_CHUNK_SIZE
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.text.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Следующий значащий символ; '' в конце файла."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f'Ожидался символ {char!r}', self.buffer, self.pos)
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Значение оборвано концом буфера — дочитываем; битый файл не читаем в память целиком
+                if len(self.buffer) - self.pos > IMPORT_JSON_MAX_VALUE_SIZE or not self._fill():
+                    raise
+                continue
+            # Число в конце буфера могло быть прочитано не полностью
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self, char):
+        """Перебирает элементы массива ('[') или пары ключ-значение объекта ('{') без чтения значений."""
+        closing = ']' if char == '[' else '}'
+        self.expect(char)
+        if self.peek() == closing:
+            self.pos += 1
+            return
+        while True:
+            if char == '{':
+                key = self.value()
+                self.expect(':')
+                yield key
+            else:
+                yield None
+            if self.peek() != ',':
+                self.expect(closing)
+                return
+            self.pos += 1
+
+
+def iter_geojson_rows(file):
+    # FeatureCollection разбирается потоково: в памяти одна фича, а не весь файл
+    text = io.TextIOWrapper(file, encoding='utf-8-sig')
+    stream = _JSONStream(text)
+    try:
+        if stream.peek() != '{':
+            raise ImportFileError('Файл не является корректным GeoJSON')
+        feature = {}
+        has_features = False
+        for key in stream.items('{'):
+            if key == 'features' and stream.peek() == '[':
+                has_features = True
+                for number, _ in enumerate(stream.items('['), start=1):
+                    yield number, _feature_row(stream.value())
+            else:
+                feature[key] = stream.value()
+        if not has_features:
+            # Одиночная фича вместо коллекции
+            yield 1, _feature_row(feature)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ImportFileError('Файл не является корректным GeoJSON')
+    finally:
+        text.detach()
+
+
+def iter_ndjson_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig')
+    try:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                feature = json.loads(line)
+            except json.JSONDecodeError:
+                yield number, None
+                continue
+            yield number, _feature_row(feature)
+    except UnicodeDecodeError:
+        raise ImportFileError('Файл должен быть в кодировке UTF-8')
+    finally:
+        text.detach()
+
+
+ROW_READERS = {
+    'csv': iter_csv_rows,
+    'xlsx': iter_xlsx_rows,
+    'geojson': iter_geojson_rows,
+    'ndjson': iter_ndjson_rows,
+}
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _first_message(detail):
+    while isinstance(detail, (list, dict)):
+        detail = next(iter(detail.values() if isinstance(detail, dict) else detail), '')
+    return str(detail)
+
+
+class ObjectRowBuilder:
+    """
+    Проверяет строку импорта теми же правилами, что ObjectSerializer, и строит Object.
+    Статусы берутся из реестра, пользователи — из словарей, загруженных один раз.
+    """
+
+    def __init__(self):
+        from .api.serializers import ObjectSerializer
+
+        self.serializer = ObjectSerializer()
+        self.user_ids = set()
+        self.users_by_username = {}
+        for pk, username in User.objects.values_list('id', 'username'):
+            self.user_ids.add(pk)
+            self.users_by_username[username] = pk
+        self.max_lengths = {
+            field: Object._meta.get_field(field).max_length
+            for field in ('code', 'title', 'address', 'region')
+        }
+
+    def _status(self, value):
+        value = _text(value)
+        if not value:
+            raise serializers.ValidationError('Не указан статус')
+        status = status_registry.get(value) if value.isdigit() else status_registry.get_by_name(value)
+        if status is None:
+            raise serializers.ValidationError(f'Статус «{value}» не найден')
+        return status.id
+
+    def _responsible(self, value):
+        value = _text(value)
+        if not value:
+            raise serializers.ValidationError('Не указан ответственный')
+        if value.isdigit() and int(value) in self.user_ids:
+            return int(value)
+        if value in self.users_by_username:
+            return self.users_by_username[value]
+        raise serializers.ValidationError(f'Пользователь «{value}» не найден')
+
+    def _date(self, value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        value = _text(value)
+        if not value:
+            raise serializers.ValidationError('Не указана дата')
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        raise serializers.ValidationError('Неверный формат даты. Ожидалось ГГГГ-ММ-ДД или ДД.ММ.ГГГГ')
+
+    def build(self, row):
+        """Возвращает (Object, None) или (None, {поле: ошибка})."""
+        if row is None:
+            return None, {'row': 'Строка не является корректным JSON'}
+
+        errors = {}
+        values = {}
+
+        for field in ('code', 'title', 'address', 'region', 'description'):
+            value = _text(row.get(field))
+            max_length = self.max_lengths.get(field)
+            if max_length and len(value) > max_length:
+                errors[field] = f'Не более {max_length} символов'
+            values[field] = value
+        for field in ('title', 'address'):
+            if not values[field] and field not in errors:
+                errors[field] = 'Обязательное поле'
+
+        for field, resolve in (
+            ('status', self._status),
+            ('responsible', self._responsible),
+            ('start_date', self._date),
+            ('end_date', self._date),
+        ):
+            try:
+                values[field] = resolve(row.get(field))
+            except serializers.ValidationError as exc:
+                errors[field] = _first_message(exc.detail)
+
+        coordinates = row.get('coordinates')
+        if coordinates in (None, ''):
+            coordinates = [row.get('lng'), row.get('lat')]
+        try:
+            lng, lat = self.serializer.validate_coordinates_input(coordinates)
+        except serializers.ValidationError as exc:
+            errors['coordinates'] = _first_message(exc.detail)
+
+        if not errors:
+            try:
+                self.serializer.validate({'start_date': values['start_date'], 'end_date': values['end_date']})
+            except serializers.ValidationError as exc:
+                errors.update({field: _first_message(detail) for field, detail in exc.detail.items()})
+
+        if errors:
+            return None, errors
+
+        obj = Object(
+            title=values['title'],
+            address=values['address'],
+            region=values['region'],
+            description=values['description'],
+            status_id=values['status'],
+            responsible_id=values['responsible'],
+            start_date=values['start_date'],
+            end_date=values['end_date'],
+            coordinates=Point(lng, lat, srid=4326),
+        )
+        # Без кода в файле его присвоит база (DEFAULT из objects_code_seq)
+        if values['code']:
+            obj.code = values['code']
+        return obj, None
+
+
+class ObjectImport:
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.total = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def flush(self, batch):
+        if not batch:
+            return
+        if self.dry_run:
+            self.created += len(batch)
+            return
+        # Коды из файла в пространстве OBJ- занимают номера последовательности — сдвигаем её
+        # до вставки, иначе DEFAULT выдаст тот же код этой же пачке или следующему объекту
+        advance_object_code_sequence([obj.code for _, obj in batch])
+        try:
+            with transaction.atomic():
+                Object.objects.bulk_create([obj for _, obj in batch])
+            self.created += len(batch)
+        except IntegrityError:
+            # Скорее всего, повтор кода: вставляем пачку построчно, чтобы найти виновные строки
+            for row_number, obj in batch:
+                try:
+                    with transaction.atomic():
+                        Object.objects.bulk_create([obj])
+                    self.created += 1
+                except IntegrityError:
+                    self.add_error(row_number, {'code': 'Объект с таким кодом уже существует'})
+
+    def run(self, rows):
+        builder = ObjectRowBuilder()
+        batch = []
+        for row_number, row in rows:
+            self.total += 1
+            obj, errors = builder.build(row)
+            if errors:
+                self.add_error(row_number, errors)
+                continue
+            batch.append((row_number, obj))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+
+        if self.created and not self.dry_run:
+            # bulk_create не отправляет post_save — версию кеша объектов сбрасываем сами
+            transaction.on_commit(bump_objects_version)
+        return self.summary()
+
+    def summary(self):
+        return {
+            'total': self.total,
+            'created': self.created,
+            'failed': self.failed,
+            'dry_run': self.dry_run,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def import_objects(file, format, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    if format not in ROW_READERS:
+        raise ImportFileError(f"Неподдерживаемый формат. Доступно: {', '.join(IMPORT_FORMATS)}")
+    return ObjectImport(batch_size=batch_size, dry_run=dry_run).run(ROW_READERS[format](file))
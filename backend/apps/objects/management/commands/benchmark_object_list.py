@@ -0,0 +1,101 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.utils.encoders import JSONEncoder
+from ...api.compact import CompactObjectSerializer, object_rows
+from ...api.serializers import ObjectSerializer
+from ...cache import bump_version
+from ...models import Status, Object
+from ...registry import STATUSES_VERSION_KEY
+from ....users.models import Role, User
+
+
+def seed_objects(objects_count, responsibles_count, region='Ленинский'):
+    """Объекты для бенчмарков; вызывается внутри транзакции, которая потом откатывается."""
+    role, _ = Role.objects.get_or_create(name=Role.MASTER)
+    users = User.objects.bulk_create([
+        User(username=f'benchmark_{i}', last_name=f'Мастер {i}', role=role)
+        for i in range(responsibles_count)
+    ])
+    statuses = [
+        Status.objects.get_or_create(name=name, defaults={'color': color})[0]
+        for name, color in [('Планируется', '#6c757d'), ('В работе', '#007bff'), ('Завершён', '#28a745')]
+    ]
+    bump_version(STATUSES_VERSION_KEY)
+
+    today = date.today()
+    Object.objects.bulk_create([
+        Object(
+            title=f'Объект {i}',
+            address=f'ул. Светланская, {i}',
+            region=region,
+            description='Ремонт дорожного покрытия',
+            coordinates=Point(131.8 + random.random() * 0.2, 43.0 + random.random() * 0.2, srid=4326),
+            status=random.choice(statuses),
+            responsible=random.choice(users),
+            start_date=today - timedelta(days=random.randint(30, 365)),
+            end_date=today + timedelta(days=random.randint(-30, 60)),
+        )
+        for i in range(objects_count)
+    ])
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает ObjectSerializer и CompactObjectSerializer на странице списка объектов (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--responsibles', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                seed_objects(options['page_size'], options['responsibles'])
+                self._run(options['page_size'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Тестовые данные откатены')
+        finally:
+            bump_version(STATUSES_VERSION_KEY)
+
+    def _run(self, page_size, repeat):
+        request = RequestFactory().get('/api/objects/')
+        context = {'request': request}
+
+        def drf_page():
+            # Прежний queryset списка: без responsible__role — N+1 на роли
+            queryset = Object.objects.select_related('status', 'responsible').order_by('-created_at', '-id')
+            return ObjectSerializer(queryset[:page_size], many=True, context=context).data
+
+        def compact_page():
+            rows = object_rows(Object.objects.order_by('-created_at', '-id'))[:page_size]
+            return CompactObjectSerializer(context=context).serialize(rows)
+
+        results = {}
+        best = {}
+        for name, build in [('drf', drf_page), ('compact', compact_page)]:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                data = build()
+                body = json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+                timings.append(time.perf_counter() - started)
+            results[name] = json.loads(body)
+            best[name] = min(timings)
+            self.stdout.write(
+                f'{name:>8}: лучшее {best[name] * 1000:.0f} мс, '
+                f'{page_size / best[name]:.0f} объектов/с'
+            )
+
+        self.stdout.write(f'Ускорение: {best["drf"] / best["compact"]:.1f}x')
+        self.stdout.write(f'Ответы совпадают: {"да" if results["drf"] == results["compact"] else "нет"}')
@@ -0,0 +1,74 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from ...api import renderers
+from ...api.views import ObjectViewSet
+from ...cache import bump_version
+from ...registry import STATUSES_VERSION_KEY
+from ....users.models import Role, User
+from .benchmark_object_list import Rollback, seed_objects
+
+BENCHMARK_REGION = 'Бенчмарк'
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время кодирования и размер ответа ObjectViewSet.list для разных рендереров (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', default='10,100,1000,5000')
+        parser.add_argument('--responsibles', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        page_sizes = sorted(int(size) for size in options['page_sizes'].split(','))
+        try:
+            with transaction.atomic():
+                seed_objects(page_sizes[-1], options['responsibles'], region=BENCHMARK_REGION)
+                rows = self._list_rows()
+                for page_size in page_sizes:
+                    self._run(rows[:page_size], options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Тестовые данные откатены')
+        finally:
+            bump_version(STATUSES_VERSION_KEY)
+
+    def _list_rows(self):
+        # Данные берутся из настоящего ObjectViewSet.list; пагинация отключена, страницы режутся здесь
+        role, _ = Role.objects.get_or_create(name=Role.ADMIN)
+        admin = User.objects.create(username='benchmark_admin', role=role)
+        request = APIRequestFactory().get('/api/objects/', {'region': BENCHMARK_REGION})
+        force_authenticate(request, user=admin)
+        response = ObjectViewSet.as_view({'get': 'list'}, pagination_class=None)(request)
+        return response.data
+
+    def _renderers(self):
+        candidates = [('json (DRF)', JSONRenderer())]
+        if renderers.orjson is not None:
+            candidates.append(('orjson', renderers.FastJSONRenderer()))
+        else:
+            self.stdout.write('orjson не установлен: FastJSONRenderer работает через стандартный json')
+        if renderers.msgpack is not None:
+            candidates.append(('msgpack', renderers.MessagePackRenderer()))
+        else:
+            self.stdout.write('msgpack не установлен: MessagePackRenderer пропущен')
+        return candidates
+
+    def _run(self, rows, repeat):
+        data = {'next': None, 'previous': None, 'results': rows}
+        self.stdout.write(f'Страница из {len(rows)} объектов:')
+        baseline = None
+        for name, renderer in self._renderers():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = renderer.render(data, renderer.media_type, {})
+                timings.append(time.perf_counter() - started)
+            best = min(timings)
+            baseline = baseline or best
+            self.stdout.write(
+                f'  {name:>12}: {best * 1000:8.2f} мс, {len(body) / 1024:8.1f} КБ, '
+                f'ускорение {baseline / best:.1f}x'
+            )
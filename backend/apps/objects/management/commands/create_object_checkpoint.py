@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from ...snapshots import create_checkpoint
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет контрольную точку (статус и ответственный всех объектов) для /objects/{id}/as_of/. '
+        'Запускайте по расписанию, например раз в сутки'
+    )
+
+    def handle(self, *args, **options):
+        checkpoint = create_checkpoint()
+        self.stdout.write(self.style.SUCCESS(
+            f'Контрольная точка {checkpoint.taken_at:%d.%m.%Y %H:%M:%S} сохранена, объектов: {checkpoint.objects_count}'
+        ))
@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from ...importers import IMPORT_BATCH_SIZE, IMPORT_FORMATS, ImportFileError, detect_format, import_objects
+
+
+class Command(BaseCommand):
+    help = 'Импортирует объекты из CSV, XLSX, GeoJSON или NDJSON пачками через bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Формат; по умолчанию — по расширению')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Строк в одном INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить строки, ничего не сохранять')
+
+    def handle(self, *args, **options):
+        format = options['format'] or detect_format(options['path'])
+        if not format:
+            raise CommandError(f"Не удалось определить формат файла. Укажите --format ({', '.join(IMPORT_FORMATS)})")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                summary = import_objects(
+                    file,
+                    format,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as exc:
+            raise CommandError(f'Не удалось открыть файл: {exc}')
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+
+        for error in summary['errors']:
+            self.stderr.write(f"Строка {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        if summary['errors_truncated']:
+            self.stderr.write(f"… и ещё {summary['failed'] - len(summary['errors'])} строк с ошибками")
+
+        verb = 'Проверено' if summary['dry_run'] else 'Импортировано'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb}: {summary['created']} из {summary['total']}, с ошибками: {summary['failed']}"
+        ))
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection
+from ...images import PHOTO_FIELDS, needs_processing, process_photo
+
+
+def _process(model, pk):
+    try:
+        process_photo(model, pk)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Нормализует загруженные ранее фото и строит для них варианты (миниатюры, WebP)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Число потоков обработки')
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for model, (field_name, variants_field) in PHOTO_FIELDS.items():
+                pending = [
+                    pk for pk, name, variants in
+                    model.objects.values_list('pk', field_name, variants_field).iterator()
+                    if needs_processing(name, variants)
+                ]
+                # list() — чтобы ошибки потоков не потерялись
+                list(pool.map(lambda pk: _process(model, pk), pending))
+                self.stdout.write(f'{model._meta.verbose_name_plural}: обработано {len(pending)}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from ...models import ObjectStat
+from ...sql import refresh_object_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводку object_stats по таблице objects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Алиас базы данных')
+
+    def handle(self, *args, **options):
+        refresh_object_stats(options['database'])
+        groups = ObjectStat.objects.using(options['database']).count()
+        self.stdout.write(self.style.SUCCESS(f'Сводка object_stats пересобрана, групп: {groups}'))
@@ -0,0 +1,226 @@
+import functools
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import get_script_prefix, reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from .models import Object, CommentPhoto
+from ..users.models import User
+
+# Вид файла в URL -> модель с фото
+MEDIA_MODELS = {
+    'objects': Object,
+    'comment-photos': CommentPhoto,
+}
+MEDIA_KINDS = {model: kind for kind, model in MEDIA_MODELS.items()}
+
+# Токен в ссылке подписывает пользователя и конкретный файл и действует MEDIA_TOKEN_MAX_AGE.
+# Метка времени округляется до MEDIA_TOKEN_STEP: в пределах шага ссылка на файл не меняется
+# и браузер берёт фото из кеша
+MEDIA_TOKEN_MAX_AGE = 60 * 60
+MEDIA_TOKEN_STEP = 10 * 60
+MEDIA_TOKEN_SALT = 'objects.media'
+MEDIA_TOKEN_PARAM = 't'
+# Файл под своим именем не меняется (имя — хеш содержимого), кешировать можно надолго
+MEDIA_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+SHA256_NAME = re.compile(r'([0-9a-f]{64})\.\w+$')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class MediaTokenSigner(signing.TimestampSigner):
+    def timestamp(self):
+        return signing.b62_encode(int(time.time()) // MEDIA_TOKEN_STEP * MEDIA_TOKEN_STEP)
+
+
+def _file_key(kind, pk, name):
+    return hashlib.sha256(f'{kind}/{pk}/{name}'.encode()).hexdigest()[:32]
+
+
+def media_token(user, kind, pk, name):
+    return MediaTokenSigner(salt=MEDIA_TOKEN_SALT).sign(f'{user.pk}.{_file_key(kind, pk, name)}')
+
+
+def read_media_token(token, kind, pk, name):
+    """Возвращает id пользователя, если токен выдан на этот файл и не истёк, иначе None."""
+    try:
+        value = MediaTokenSigner(salt=MEDIA_TOKEN_SALT).unsign(token, max_age=MEDIA_TOKEN_MAX_AGE + MEDIA_TOKEN_STEP)
+        user_id, file_key = value.split('.')
+        user_id = int(user_id)
+    except (signing.BadSignature, ValueError):
+        return None
+    if not constant_time_compare(file_key, _file_key(kind, pk, name)):
+        return None
+    return user_id
+
+
+@functools.lru_cache(maxsize=None)
+def _media_path():
+    # reverse() на каждую ссылку заметно дорог в списке из сотен объектов — путь вычисляется один раз,
+    # без префикса SCRIPT_NAME: он берётся из текущего запроса
+    path = reverse('media-file', kwargs={'kind': 'objects', 'pk': 0, 'name': 'x'})
+    return path[len(get_script_prefix()):-len('objects/0/x')]
+
+
+def _url_root(request):
+    """Начало ссылки на файл; считается один раз на запрос."""
+    root = getattr(request, '_media_url_root', None)
+    if root is None:
+        root = get_script_prefix() + _media_path()
+        if request is not None:
+            root = request.build_absolute_uri(root)
+            request._media_url_root = root
+    return root
+
+
+def media_url(request, model, pk, name):
+    """Ссылка на файл через MediaFileView с токеном текущего пользователя на этот файл."""
+    if not name:
+        return None
+    kind = MEDIA_KINDS[model]
+    url = f'{_url_root(request)}{kind}/{pk}/{quote(name)}'
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        url += f'?{MEDIA_TOKEN_PARAM}={media_token(user, kind, pk, name)}'
+    return url
+
+
+def build_media_urls(request, model, pk, names):
+    """{вариант: имя файла} -> {вариант: ссылка}."""
+    if names is None:
+        return None
+    return {variant: media_url(request, model, pk, name) for variant, name in names.items()}
+
+
+class MediaTokenAuthentication(BaseAuthentication):
+    """
+    Аутентификация по токену из ссылки на файл: <img> не умеет отправлять заголовок
+    Authorization. Токен выдаётся в ссылках сериализаторов (media_url) и подписан вместе
+    с видом, id записи и именем файла: сверяется с ними из URL, поэтому открывает
+    только тот файл, на который выдан.
+    """
+
+    def authenticate(self, request):
+        token = request.query_params.get(MEDIA_TOKEN_PARAM)
+        if not token:
+            return None
+        kwargs = (request.parser_context or {}).get('kwargs', {})
+        user_id = read_media_token(token, kwargs.get('kind'), kwargs.get('pk'), kwargs.get('name'))
+        user = User.objects.select_related('role').filter(pk=user_id, is_active=True).first() if user_id else None
+        if user is None:
+            raise AuthenticationFailed('Ссылка на файл недействительна или устарела')
+        return user, token
+
+
+def _etag(name, stat):
+    # Для файлов хранилища по содержимому ETag — это хеш; для старых — размер и время изменения
+    match = SHA256_NAME.search(name)
+    if match:
+        return quote_etag(match.group(1))
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def _byte_range(header, size):
+    """(начало, конец) включительно; None — отдать файл целиком; ValueError — диапазон вне файла."""
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Несколько диапазонов и прочие формы не поддерживаем — отдаём весь файл
+        return None
+    start, end = match.groups()
+    if not start:
+        length = int(end)
+        if length == 0:
+            raise ValueError
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError
+    return start, end
+
+
+class FileRange:
+    """Часть файла для FileResponse: читается не дальше заданной длины."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _file_response(request, path, size, etag, content_type):
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = _byte_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_file(request, storage, name):
+    """
+    Отдаёт файл хранилища. С MEDIA_ACCEL передачу выполняет прокси (X-Accel-Redirect
+    для nginx, X-Sendfile для Apache/lighttpd) и Python-воркер сразу освобождается;
+    иначе — FileResponse с поддержкой Range.
+    """
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404
+
+    etag = _etag(name, stat)
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponse(status=304)
+    else:
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        accel = getattr(settings, 'MEDIA_ACCEL', '')
+        if accel == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+        elif accel == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = path
+        else:
+            response = _file_response(request, path, stat.st_size, etag, content_type)
+
+    if response.status_code != 416:
+        response['ETag'] = etag
+        response['Cache-Control'] = MEDIA_CACHE_CONTROL
+    return response
@@ -1,9 +1,26 @@
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from .functions import NextObjectCode
+from .storage import content_storage
+from .tracking import FieldHistoryMixin
 from ..users.models import User
 from ..users.permissions import IsAdmin, IsManagerOrAdmin
 
 class Status(models.Model):
+    PLANNED = 'planned'
+    IN_PROGRESS = 'in_progress'
+    COMPLETED = 'completed'
+    OTHER = 'other'
+
+    CATEGORY_CHOICES = [
+        (PLANNED, 'Запланирован'),
+        (IN_PROGRESS, 'В работе'),
+        (COMPLETED, 'Завершён'),
+        (OTHER, 'Прочее'),
+    ]
+
     name = models.CharField(
         max_length=100,
         unique=True,
@@ -26,6 +43,13 @@ class Status(models.Model):
         default=True,
         verbose_name='Активен'
     )
+    category = models.CharField(
+        max_length=20,
+        choices=CATEGORY_CHOICES,
+        default=OTHER,
+        verbose_name='Категория для отчётов',
+        help_text='Завершённые и текущие работы в отчётах считаются по категории, а не по названию'
+    )
 
     class Meta:
         db_table = 'statuses'
@@ -37,12 +61,20 @@ class Status(models.Model):
         return self.name
 
 
-class Object(gis_models.Model):
+class Object(FieldHistoryMixin, gis_models.Model):
+    # Изменения этих полей автоматически пишутся в History (см. tracking.py)
+    tracked_fields = (
+        'code', 'title', 'address', 'region', 'description', 'status', 'responsible',
+        'start_date', 'end_date', 'coordinates', 'main_photo',
+    )
+
+    # Присваивается базой в том же INSERT (последовательность objects_code_seq) и возвращается через RETURNING
     code = models.CharField(
         max_length=50,
         unique=True,
         blank=True,
         null=True,
+        db_default=NextObjectCode(),
         verbose_name='Код объекта'
     )
 
@@ -101,21 +133,129 @@ class Object(gis_models.Model):
 
     main_photo = models.ImageField(
         upload_to='objects/photos/%Y/%m/',
+        storage=content_storage,
         blank=True,
         null=True,
         verbose_name='Главное фото объекта',
         help_text='Фотография будет сохранена на сервере'
     )
+    # Уменьшенные копии главного фото, строятся в фоне (см. images.py)
+    main_photo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты главного фото'
+    )
+
+    # Заполняется триггером objects_search_vector_update (см. sql.py)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False
+    )
 
     class Meta:
         db_table = 'objects'
         verbose_name = 'Объект'
         verbose_name_plural = 'Объекты'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['end_date'], name='objects_end_date_idx'),
+            # Ключ курсорной пагинации (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='objects_created_id_idx'),
+            GinIndex(fields=['search_vector'], name='objects_search_vector_idx'),
+            # pg_trgm: нечёткий поиск по адресу и коду
+            GinIndex(fields=['address'], opclasses=['gin_trgm_ops'], name='objects_address_trgm_idx'),
+            GinIndex(fields=['code'], opclasses=['gin_trgm_ops'], name='objects_code_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.code or f'OBJ-{self.id}'}: {self.title}"
 
+    def history_related_labels(self, changes):
+        # Статусы — по названию, как в update_status; ответственные — по логину
+        from .registry import status_registry
+
+        labels = {}
+        user_ids = set()
+        for name, old, new in changes:
+            for pk in (old, new):
+                if pk is None:
+                    continue
+                if name == 'status':
+                    status = status_registry.get(pk)
+                    labels[(name, pk)] = status.name if status else str(pk)
+                elif name == 'responsible':
+                    user_ids.add(pk)
+
+        responsible = self._state.fields_cache.get('responsible')
+        if responsible is not None and responsible.pk in user_ids:
+            labels[('responsible', responsible.pk)] = responsible.username
+            user_ids.discard(responsible.pk)
+        if user_ids:
+            for pk, username in User.objects.filter(id__in=user_ids).values_list('id', 'username'):
+                labels[('responsible', pk)] = username
+        return labels
+
+
+class ObjectStat(models.Model):
+    """
+    Сводка числа объектов по (район, статус, ответственный).
+
+    Поддерживается триггерами на таблице objects (см. sql.py), поэтому учитывает и
+    массовые UPDATE/INSERT. Строки с count = 0 не удаляются до пересборки командой
+    refresh_object_stats.
+    """
+    region = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name='Район / Регион'
+    )
+    status = models.ForeignKey(
+        Status,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Статус'
+    )
+    responsible = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='object_stats',
+        verbose_name='Ответственный'
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name='Количество объектов'
+    )
+
+    class Meta:
+        db_table = 'object_stats'
+        verbose_name = 'Статистика объектов'
+        verbose_name_plural = 'Статистика объектов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['region', 'status', 'responsible'],
+                name='object_stats_group_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.region or '-'} / {self.status_id} / {self.responsible_id}: {self.count}"
+
+
+class HistoryQuerySet(models.QuerySet):
+    def with_status_color(self):
+        # Цвет нового статуса подзапросом в том же SELECT — без запроса на каждую запись
+        return self.annotate(
+            status_color=models.Case(
+                models.When(
+                    field_name='status',
+                    then=models.Subquery(
+                        Status.objects.filter(name=models.OuterRef('new_value')).order_by().values('color')[:1]
+                    ),
+                ),
+            )
+        )
+
 
 class History(models.Model):
     object = models.ForeignKey(
@@ -148,16 +288,88 @@ class History(models.Model):
         verbose_name='Дата изменения'
     )
 
+    objects = HistoryQuerySet.as_manager()
+
     class Meta:
         db_table = 'history'
         verbose_name = 'Запись истории'
         verbose_name_plural = 'История изменений'
         ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['object', '-changed_at', '-id'], name='history_object_changed_idx'),
+            # Восстановление состояния на дату: первое изменение поля после момента t
+            models.Index(fields=['object', 'field_name', 'changed_at'], name='history_object_field_idx'),
+        ]
 
     def __str__(self):
         return f"{self.object} - {self.field_name} ({self.changed_at.strftime('%d.%m.%Y %H:%M')})"
 
 
+class ObjectCheckpoint(models.Model):
+    """
+    Контрольная точка: статус и ответственный всех объектов на момент taken_at.
+
+    Ограничивает объём History, который нужно просмотреть при восстановлении
+    состояния на дату (см. snapshots.py).
+    """
+    taken_at = models.DateTimeField(
+        db_index=True,
+        verbose_name='Момент снимка'
+    )
+    objects_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Объектов в снимке'
+    )
+
+    class Meta:
+        db_table = 'object_checkpoints'
+        verbose_name = 'Контрольная точка'
+        verbose_name_plural = 'Контрольные точки'
+        ordering = ['-taken_at']
+
+    def __str__(self):
+        return f"{self.taken_at:%d.%m.%Y %H:%M} ({self.objects_count})"
+
+
+class ObjectSnapshot(models.Model):
+    # Архивные данные: без ограничений FK, чтобы удаление объектов и пользователей их не затрагивало
+    checkpoint = models.ForeignKey(
+        ObjectCheckpoint,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        verbose_name='Контрольная точка'
+    )
+    object = models.ForeignKey(
+        'Object',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Объект'
+    )
+    status = models.ForeignKey(
+        Status,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Статус'
+    )
+    responsible = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Ответственный'
+    )
+
+    class Meta:
+        db_table = 'object_snapshots'
+        verbose_name = 'Снимок объекта'
+        verbose_name_plural = 'Снимки объектов'
+        constraints = [
+            models.UniqueConstraint(fields=['checkpoint', 'object'], name='object_snapshots_unique'),
+        ]
+
+
 class Comment(models.Model):
     object = models.ForeignKey(
         'Object',
@@ -184,6 +396,10 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='comments_created_id_idx'),
+            models.Index(fields=['object', '-created_at', '-id'], name='comments_object_created_idx'),
+        ]
 
     def __str__(self):
         return f"Комментарий от {self.author.username} к {self.object.title[:30]}"
@@ -198,8 +414,15 @@ class CommentPhoto(models.Model):
     )
     photo = models.ImageField(
         upload_to='comments/photos/%Y/%m/',
+        storage=content_storage,
         verbose_name='Фото'
     )
+    variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты фото'
+    )
     uploaded_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата загрузки'
@@ -212,4 +435,32 @@ class CommentPhoto(models.Model):
         ordering = ['uploaded_at']
 
     def __str__(self):
-        return f"Фото к комментарию {self.comment.id}"
\ No newline at end of file
+        return f"Фото к комментарию {self.comment.id}"
+
+
+class StoredFile(models.Model):
+    """Учёт ссылок на файлы ContentAddressedStorage (см. storage.py)."""
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Путь'
+    )
+    size = models.BigIntegerField(
+        verbose_name='Размер, байт'
+    )
+    ref_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+
+    class Meta:
+        db_table = 'stored_files'
+        verbose_name = 'Файл хранилища'
+        verbose_name_plural = 'Файлы хранилища'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
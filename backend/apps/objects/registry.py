@@ -0,0 +1,103 @@
+import hashlib
+import threading
+import time
+from django.conf import settings
+from .cache import get_version
+
+STATUSES_VERSION_KEY = 'statuses:version'
+# Поля, по которым считается версия содержимого реестра (совпадают с StatusSerializer)
+DIGEST_FIELDS = ('id', 'name', 'color', 'description', 'order', 'is_active', 'category')
+# Промах по id/названию перечитывает реестр, но не чаще раза в столько секунд:
+# новый статус из другого воркера виден сразу, а поиск удалённых статусов в цикле не бьёт в базу
+MISS_RELOAD_INTERVAL = 1.0
+
+_NOT_LOADED = object()
+
+
+class StatusRegistry:
+    """
+    Копия таблицы statuses в памяти процесса.
+
+    Перед каждым обращением сверяется с версией в кеше Django, которую увеличивают
+    сигналы post_save/post_delete модели Status. Изменения сразу видны всем воркерам,
+    только если кеш общий (Redis, Memcached); с LocMemCache у каждого процесса своя версия,
+    поэтому реестр в любом случае перечитывается не реже раза в ttl секунд, а неизвестный
+    id или название статуса перечитывает его сразу.
+    Возвращаемые экземпляры общие для всех запросов — изменять их нельзя.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = _NOT_LOADED
+        self._loaded_at = 0.0
+        self._expires = 0.0
+        self._digest = ''
+        self._ordered = []
+        self._by_id = {}
+        self._by_name = {}
+
+    def _refresh(self, force=False):
+        version = get_version(STATUSES_VERSION_KEY)
+        if not force and version == self._version and time.monotonic() < self._expires:
+            return
+        with self._lock:
+            if not force and version == self._version and time.monotonic() < self._expires:
+                return
+            from .models import Status
+
+            statuses = list(Status.objects.order_by('order', 'name'))
+            self._ordered = statuses
+            self._by_id = {status.id: status for status in statuses}
+            self._by_name = {status.name: status for status in statuses}
+            self._digest = hashlib.md5(repr([
+                [getattr(status, field) for field in DIGEST_FIELDS] for status in statuses
+            ]).encode()).hexdigest()
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self._expires = self._loaded_at + self.ttl
+
+    def _lookup(self, index, key):
+        self._refresh()
+        status = getattr(self, index).get(key)
+        if status is None and time.monotonic() - self._loaded_at >= MISS_RELOAD_INTERVAL:
+            # Статус мог появиться в другом воркере, а версия в кеше до нас ещё не дошла
+            self._refresh(force=True)
+            status = getattr(self, index).get(key)
+        return status
+
+    @property
+    def version(self):
+        # Версия по содержимому: одинакова во всех воркерах и меняется, даже если
+        # изменение пришло через перечитывание по ttl, а не через версию в кеше
+        self._refresh()
+        return self._digest
+
+    def all(self):
+        self._refresh()
+        return list(self._ordered)
+
+    def active(self):
+        self._refresh()
+        return [status for status in self._ordered if status.is_active]
+
+    def get(self, pk):
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        return self._lookup('_by_id', pk)
+
+    def get_by_name(self, name):
+        return self._lookup('_by_name', name)
+
+    def ids_for_categories(self, *categories):
+        self._refresh()
+        return [status.id for status in self._ordered if status.category in categories]
+
+    def color_for(self, name):
+        status = self.get_by_name(name)
+        return status.color if status else None
+
+
+status_registry = StatusRegistry(ttl=getattr(settings, 'STATUS_REGISTRY_TTL', 60))
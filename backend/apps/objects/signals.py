@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Status, Object, CommentPhoto
+from .cache import bump_version, bump_objects_version
+from .images import IMAGE_VARIANTS, needs_processing, photo_files, schedule_processing
+from .storage import content_storage
+from .registry import STATUSES_VERSION_KEY
+
+
+# Версии увеличиваются после коммита, иначе другой воркер может перечитать
+# ещё не зафиксированные данные и закешировать их под новой версией
+
+@receiver([post_save, post_delete], sender=Object)
+def invalidate_objects_cache(sender, **kwargs):
+    transaction.on_commit(bump_objects_version)
+
+
+@receiver([post_save, post_delete], sender=Status)
+def invalidate_status_registry(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(STATUSES_VERSION_KEY))
+    # цвет статуса входит в тайлы
+    transaction.on_commit(bump_objects_version)
+
+
+def _release_files(names):
+    # Файл удалится с диска, только когда на него не останется ссылок (см. storage.py)
+    if names:
+        transaction.on_commit(lambda: [content_storage.delete(name) for name in names])
+
+
+@receiver(pre_save, sender=Object)
+def collect_replaced_photo(sender, instance, update_fields=None, **kwargs):
+    """
+    Фото объекта заменили или убрали: старый оригинал и его варианты освобождаются
+    после коммита. Прежнее имя берётся из снимка полей, сделанного при загрузке (tracking.py).
+    """
+    snapshot = getattr(instance, '_tracked_snapshot', None)
+    if instance._state.adding or not snapshot or 'main_photo' not in snapshot:
+        return
+    if update_fields is not None and 'main_photo' not in update_fields:
+        return
+    old_name = snapshot['main_photo']
+    if not old_name or old_name == (instance.main_photo.name or None):
+        return
+
+    names = [old_name]
+    if update_fields is None or 'main_photo_variants' in update_fields:
+        # Варианты старого фото освобождаем здесь же, а process_photo их уже не увидит
+        variants = instance.main_photo_variants or {}
+        names += [variants[key] for key in IMAGE_VARIANTS if key in variants]
+        instance.main_photo_variants = {}
+    instance._replaced_photo_files = names
+
+
+@receiver(post_save, sender=Object)
+def release_replaced_photo(sender, instance, **kwargs):
+    _release_files(instance.__dict__.pop('_replaced_photo_files', None))
+
+
+@receiver(post_save, sender=Object)
+def process_object_photo(sender, instance, **kwargs):
+    if needs_processing(instance.main_photo.name, instance.main_photo_variants):
+        schedule_processing(Object, instance.pk)
+
+
+@receiver(post_save, sender=CommentPhoto)
+def process_comment_photo(sender, instance, **kwargs):
+    if needs_processing(instance.photo.name, instance.variants):
+        schedule_processing(CommentPhoto, instance.pk)
+
+
+@receiver(post_delete, sender=Object)
+@receiver(post_delete, sender=CommentPhoto)
+def release_photo_files(sender, instance, **kwargs):
+    _release_files(photo_files(instance))
+
+
+# Категории для статусов, которые раньше распознавались в отчётах по названию
+DEFAULT_STATUS_CATEGORIES = {
+    'Планируется': Status.PLANNED,
+    'В работе': Status.IN_PROGRESS,
+    'Завершён': Status.COMPLETED,
+}
+
+
+def assign_default_status_categories(sender, using='default', **kwargs):
+    updated = 0
+    for name, category in DEFAULT_STATUS_CATEGORIES.items():
+        updated += Status.objects.using(using).filter(name=name, category=Status.OTHER).update(category=category)
+    if updated:
+        bump_version(STATUSES_VERSION_KEY)
@@ -0,0 +1,122 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Object, ObjectCheckpoint, ObjectSnapshot, History
+from .registry import status_registry
+from ..users.models import User
+
+# Поля, состояние которых восстанавливается на дату
+AS_OF_FIELDS = ('status', 'responsible')
+
+CHECKPOINT_SQL = """
+    INSERT INTO object_snapshots (checkpoint_id, object_id, status_id, responsible_id)
+    SELECT %s, id, status_id, responsible_id FROM objects
+"""
+
+
+def create_checkpoint():
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # SHARE блокирует запись в objects до коммита: изменения, не попавшие в снимок,
+            # получат в History changed_at позже taken_at
+            cursor.execute('LOCK TABLE objects IN SHARE MODE')
+            checkpoint = ObjectCheckpoint.objects.create(taken_at=timezone.now())
+            cursor.execute(CHECKPOINT_SQL, [checkpoint.id])
+            checkpoint.objects_count = cursor.rowcount
+        checkpoint.save(update_fields=['objects_count'])
+    return checkpoint
+
+
+def _first_changes_after(object_ids, moment, until=None):
+    """
+    Для каждой пары (объект, поле) — old_value первого изменения после moment.
+    DISTINCT ON по индексу (object, field_name, changed_at): одна запись на пару,
+    без просмотра остальной истории.
+    """
+    changes = History.objects.filter(
+        object_id__in=object_ids,
+        field_name__in=AS_OF_FIELDS,
+        changed_at__gt=moment,
+    )
+    if until is not None:
+        changes = changes.filter(changed_at__lte=until)
+    return changes.order_by('object_id', 'field_name', 'changed_at', 'id').distinct(
+        'object_id', 'field_name'
+    ).values_list('object_id', 'field_name', 'old_value')
+
+
+def _base_state(object_ids, checkpoint):
+    if checkpoint is None:
+        rows = Object.objects.filter(id__in=object_ids).values_list('id', 'status_id', 'responsible_id')
+    else:
+        rows = ObjectSnapshot.objects.filter(checkpoint=checkpoint, object_id__in=object_ids).values_list(
+            'object_id', 'status_id', 'responsible_id'
+        )
+    return {pk: (status_id, responsible_id) for pk, status_id, responsible_id in rows}
+
+
+def _rewind(object_ids, moment, checkpoint):
+    """Состояние от checkpoint (None — текущее), откатанное назад до moment: {id: (статус, логин)}."""
+    base = _base_state(object_ids, checkpoint)
+    until = checkpoint.taken_at if checkpoint else None
+    # В History статус хранится названием, ответственный — логином
+    overrides = {
+        (pk, field_name): old_value
+        for pk, field_name, old_value in _first_changes_after(list(base), moment, until)
+    }
+
+    users = dict(
+        User.objects.filter(id__in={responsible_id for _, responsible_id in base.values()})
+        .values_list('id', 'username')
+    )
+    states = {}
+    for pk, (status_id, responsible_id) in base.items():
+        status = status_registry.get(status_id)
+        states[pk] = (
+            overrides.get((pk, 'status'), status.name if status else None),
+            overrides.get((pk, 'responsible'), users.get(responsible_id)),
+        )
+    return states
+
+
+def objects_state_as_of(object_ids, moment):
+    """
+    Статус и ответственный объектов на момент moment: {id: {...}}.
+
+    Базой служит ближайшая контрольная точка после moment (или текущее состояние),
+    от неё история откатывается назад — читаются только изменения в интервале (moment, точка].
+    Объекты, созданные позже moment, в результат не попадают.
+    """
+    object_ids = list(
+        Object.objects.filter(id__in=object_ids, created_at__lte=moment).values_list('id', flat=True)
+    )
+    if not object_ids:
+        return {}
+
+    checkpoint = ObjectCheckpoint.objects.filter(taken_at__gte=moment).order_by('taken_at').first()
+    states = _rewind(object_ids, moment, checkpoint)
+    missing = [pk for pk in object_ids if pk not in states]
+    if checkpoint and missing:
+        # Объект мог быть создан транзакцией, зафиксированной уже после снимка
+        states.update(_rewind(missing, moment, None))
+
+    usernames = {username for _, username in states.values() if username}
+    ids_by_username = {
+        username: pk
+        for pk, username in User.objects.filter(username__in=usernames).values_list('id', 'username')
+    }
+
+    result = {}
+    for pk in object_ids:
+        if pk not in states:
+            continue
+        status_name, responsible_name = states[pk]
+        status = status_registry.get_by_name(status_name) if status_name else None
+        result[pk] = {
+            'id': pk,
+            'status_id': status.id if status else None,
+            'status': status_name,
+            'status_color': status.color if status else None,
+            'responsible_id': ids_by_username.get(responsible_name),
+            'responsible': responsible_name,
+        }
+    return result
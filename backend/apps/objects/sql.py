@@ -0,0 +1,148 @@
+from django.db import connections, transaction
+from .codes import OBJECT_CODE_PREFIX, OBJECT_CODE_SEQUENCE
+
+# Статистика object_stats: триггеры уровня оператора с таблицами переходов,
+# так что bulk_create и массовый UPDATE пересчитывают сводку одним запросом
+OBJECT_STATS_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION object_stats_on_insert() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO object_stats (region, status_id, responsible_id, count)
+        SELECT region, status_id, responsible_id, COUNT(*) FROM new_rows GROUP BY 1, 2, 3
+        ON CONFLICT (region, status_id, responsible_id)
+        DO UPDATE SET count = object_stats.count + EXCLUDED.count;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION object_stats_on_delete() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO object_stats (region, status_id, responsible_id, count)
+        SELECT region, status_id, responsible_id, -COUNT(*) FROM old_rows GROUP BY 1, 2, 3
+        ON CONFLICT (region, status_id, responsible_id)
+        DO UPDATE SET count = object_stats.count + EXCLUDED.count;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION object_stats_on_update() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO object_stats (region, status_id, responsible_id, count)
+        SELECT region, status_id, responsible_id, SUM(delta) FROM (
+            SELECT region, status_id, responsible_id, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT region, status_id, responsible_id, 1 AS delta FROM new_rows
+        ) AS changes
+        GROUP BY 1, 2, 3
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (region, status_id, responsible_id)
+        DO UPDATE SET count = object_stats.count + EXCLUDED.count;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS object_stats_insert ON objects",
+    """
+    CREATE TRIGGER object_stats_insert AFTER INSERT ON objects
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION object_stats_on_insert()
+    """,
+    "DROP TRIGGER IF EXISTS object_stats_delete ON objects",
+    """
+    CREATE TRIGGER object_stats_delete AFTER DELETE ON objects
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION object_stats_on_delete()
+    """,
+    "DROP TRIGGER IF EXISTS object_stats_update ON objects",
+    """
+    CREATE TRIGGER object_stats_update AFTER UPDATE ON objects
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION object_stats_on_update()
+    """,
+]
+
+# Нужно до миграций: индексы gin_trgm_ops и DEFAULT колонки objects.code создаются в миграции objects
+PRE_MIGRATE_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE SEQUENCE IF NOT EXISTS {OBJECT_CODE_SEQUENCE}",
+]
+
+# Продвигаем последовательность за уже выданные коды вида OBJ-00042 (в т.ч. выданные до её появления)
+SYNC_OBJECT_CODE_SEQUENCE_SQL = f"""
+    SELECT setval('{OBJECT_CODE_SEQUENCE}', existing.max_number)
+    FROM (
+        SELECT MAX(substring(code FROM '^{OBJECT_CODE_PREFIX}([0-9]+)$')::bigint) AS max_number FROM objects
+    ) AS existing
+    WHERE existing.max_number IS NOT NULL
+      AND existing.max_number >= (
+          SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END FROM {OBJECT_CODE_SEQUENCE}
+      )
+"""
+
+SEARCH_VECTOR_EXPRESSION = """
+    setweight(to_tsvector('russian', coalesce({row}.code, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}.title, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}.address, '')), 'B') ||
+    setweight(to_tsvector('russian', coalesce({row}.region, '')), 'C') ||
+    setweight(to_tsvector('russian', coalesce({row}.description, '')), 'D')
+"""
+
+# search_vector пересчитывается только при изменении текстовых полей,
+# массовая смена статуса его не трогает
+OBJECT_SEARCH_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION objects_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_EXPRESSION.format(row='NEW')};
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS objects_search_vector_update ON objects",
+    """
+    CREATE TRIGGER objects_search_vector_update
+    BEFORE INSERT OR UPDATE OF code, title, address, region, description, search_vector ON objects
+    FOR EACH ROW EXECUTE FUNCTION objects_search_vector_update()
+    """,
+    # Заполнение для строк, созданных до установки триггера
+    "UPDATE objects SET search_vector = NULL WHERE search_vector IS NULL",
+]
+
+REFRESH_OBJECT_STATS_SQL = [
+    # Блокируем запись в objects на время пересборки, чтобы не потерять изменения
+    "LOCK TABLE objects IN SHARE MODE",
+    "DELETE FROM object_stats",
+    """
+    INSERT INTO object_stats (region, status_id, responsible_id, count)
+    SELECT region, status_id, responsible_id, COUNT(*) FROM objects GROUP BY 1, 2, 3
+    """,
+]
+
+
+def refresh_object_stats(using='default'):
+    """Пересобирает object_stats с нуля; заодно удаляет строки с нулевым count."""
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for statement in REFRESH_OBJECT_STATS_SQL:
+            cursor.execute(statement)
+
+
+def install_prerequisites(sender, using='default', **kwargs):
+    with connections[using].cursor() as cursor:
+        for statement in PRE_MIGRATE_SQL:
+            cursor.execute(statement)
+
+
+def install_database_objects(sender, using='default', **kwargs):
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            for statement in OBJECT_STATS_SQL + OBJECT_SEARCH_SQL:
+                cursor.execute(statement)
+            cursor.execute(SYNC_OBJECT_CODE_SEQUENCE_SQL)
+            cursor.execute(
+                "SELECT NOT EXISTS (SELECT 1 FROM object_stats) AND EXISTS (SELECT 1 FROM objects)"
+            )
+            needs_refresh = cursor.fetchone()[0]
+        if needs_refresh:
+            refresh_object_stats(using)
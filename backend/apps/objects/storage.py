@@ -0,0 +1,135 @@
+import hashlib
+import os
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+
+# Каталог хранилища внутри MEDIA_ROOT и каталог для недописанных файлов
+CONTENT_ROOT = 'cas'
+CONTENT_TMP_DIR = os.path.join(CONTENT_ROOT, 'tmp')
+EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+
+ADD_REFERENCE_SQL = """
+    INSERT INTO stored_files (name, size, ref_count, created_at)
+    VALUES (%s, %s, 1, now())
+    ON CONFLICT (name) DO UPDATE SET ref_count = stored_files.ref_count + 1
+"""
+RELEASE_REFERENCE_SQL = """
+    UPDATE stored_files SET ref_count = ref_count - 1
+    WHERE name = %s
+    RETURNING ref_count
+"""
+FORGET_FILE_SQL = 'DELETE FROM stored_files WHERE name = %s AND ref_count <= 0'
+# Строка без ссылок — только блокировка имени на время удаления файла без учёта ссылок
+LOCK_UNREFERENCED_SQL = """
+    INSERT INTO stored_files (name, size, ref_count, created_at)
+    VALUES (%s, 0, 0, now())
+    ON CONFLICT (name) DO NOTHING
+"""
+
+
+def content_name(digest, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    return f'{CONTENT_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файлы хранятся под SHA-256 содержимого: cas/ab/cd/<sha256>.<ext>. Имя из upload_to
+    используется только ради расширения. Одинаковые загрузки записываются один раз,
+    число ссылок на файл ведётся в таблице stored_files: save() добавляет ссылку,
+    delete() снимает, файл удаляется с диска вместе с последней ссылкой.
+
+    Строка stored_files блокируется на время изменения — параллельные save() и delete()
+    одного файла выполняются по очереди. Файлы, загруженные до перехода на это хранилище,
+    в таблице не учтены и удаляются сразу, как раньше.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя определяется содержимым, в _save(); проверять исходное незачем
+        return name
+
+    def _write_temporary(self, content):
+        # Пишем во временный файл и одновременно считаем хеш — содержимое читается один раз
+        directory = self.path(CONTENT_TMP_DIR)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as output:
+            try:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    output.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                output.close()
+                os.remove(output.name)
+                raise
+        return output.name, digest.hexdigest(), size
+
+    def prepare(self, name, content):
+        """
+        Первая половина save(): пишет содержимое во временный файл и считает хеш, к базе
+        не обращается — её можно выполнять в пуле потоков. Возвращает (имя, временный путь, размер).
+        """
+        temporary_path, digest, size = self._write_temporary(content)
+        return content_name(digest, name), temporary_path, size
+
+    def save_prepared(self, prepared):
+        """Вторая половина save(): учёт ссылки в текущем соединении и перенос файла на место."""
+        name, temporary_path, size = prepared
+        full_path = self.path(name)
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(ADD_REFERENCE_SQL, [name, size])
+                if not os.path.exists(full_path):
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    # Переименование атомарно: читатели не увидят недописанный файл
+                    os.replace(temporary_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            self.discard(prepared)
+        return name
+
+    def discard(self, prepared):
+        _, temporary_path, _ = prepared
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    def _save(self, name, content):
+        return self.save_prepared(self.prepare(name, content))
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(RELEASE_REFERENCE_SQL, [name])
+                row = cursor.fetchone()
+                if row is not None and row[0] > 0:
+                    return
+                if row is not None:
+                    cursor.execute(FORGET_FILE_SQL, [name])
+            super().delete(name)
+
+    def delete_unreferenced(self, name):
+        """
+        Удаляет файл, если в stored_files на него нет строки, — например, после отката
+        транзакции, в которой он был сохранён. Пока файл удаляется, имя занято строкой
+        без ссылок, и параллельный save() того же содержимого ждёт и затем запишет файл заново.
+        """
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(LOCK_UNREFERENCED_SQL, [name])
+                if cursor.rowcount == 0:
+                    return
+                cursor.execute(FORGET_FILE_SQL, [name])
+            super().delete(name)
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,173 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from django.db import connection
+from django.db.models import Count
+from .cache import get_objects_version
+
+SUGGEST_FIELDS = ('address', 'region')
+SUGGEST_DEFAULT_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+# Не чаще одного раза за столько секунд пересобираем индекс после изменения объектов
+SUGGEST_REFRESH_INTERVAL = 30
+# Длина ключа в индексе; более длинные префиксы дополнительно сверяются с полным значением
+SUGGEST_KEY_LENGTH = 24
+# Для префиксов, под которые попадает больше ключей, top-k считается при построении индекса
+SUGGEST_PRECOMPUTE_THRESHOLD = 2000
+
+_NOT_LOADED = object()
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(value):
+    return ' '.join(value.lower().replace('ё', 'е').split())
+
+
+def _word_starts(text):
+    return [
+        index for index, char in enumerate(text)
+        if char.isalnum() and (index == 0 or not text[index - 1].isalnum())
+    ]
+
+
+class PrefixIndex:
+    """
+    Отсортированный массив ключей «значение, начиная с каждого слова» — то же, что trie,
+    но компактнее. Поиск префикса — два bisect, затем top-k по частоте среди найденных.
+    """
+
+    def __init__(self, counts):
+        self._values = list(counts)
+        self._counts = [counts[value] for value in self._values]
+        self._normalized = [normalize(value) for value in self._values]
+
+        entries = sorted(
+            (text[start:start + SUGGEST_KEY_LENGTH], index)
+            for index, text in enumerate(self._normalized)
+            for start in _word_starts(text)
+        )
+        self._keys = [key for key, _ in entries]
+        self._ids = [index for _, index in entries]
+        self._precomputed = self._precompute_frequent_prefixes()
+
+    def __len__(self):
+        return len(self._values)
+
+    def _bounds(self, key):
+        return bisect_left(self._keys, key), bisect_left(self._keys, key + '\U0010ffff')
+
+    def _range(self, key):
+        low, high = self._bounds(key)
+        return set(self._ids[low:high])
+
+    def _precompute_frequent_prefixes(self):
+        # Спускаемся по длине префикса только внутри «тяжёлых» префиксов (вроде «ул. »),
+        # поэтому на каждом уровне просматривается не больше всего массива ключей
+        precomputed = {}
+        frontier = ['']
+        for length in range(1, SUGGEST_KEY_LENGTH + 1):
+            next_frontier = []
+            for parent in frontier:
+                low, high = self._bounds(parent)
+                for prefix in {key[:length] for key in self._keys[low:high] if len(key) >= length}:
+                    prefix_low, prefix_high = self._bounds(prefix)
+                    if prefix_high - prefix_low > SUGGEST_PRECOMPUTE_THRESHOLD:
+                        precomputed[prefix] = self._top(set(self._ids[prefix_low:prefix_high]), SUGGEST_MAX_LIMIT)
+                        next_frontier.append(prefix)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return precomputed
+
+    def _top(self, candidates, limit):
+        return heapq.nsmallest(limit, candidates, key=lambda index: (-self._counts[index], self._values[index]))
+
+    def search(self, prefix, limit=SUGGEST_DEFAULT_LIMIT):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        if prefix in self._precomputed:
+            best = self._precomputed[prefix][:limit]
+        else:
+            candidates = self._range(prefix[:SUGGEST_KEY_LENGTH])
+            if len(prefix) > SUGGEST_KEY_LENGTH:
+                candidates = {index for index in candidates if prefix in self._normalized[index]}
+            best = self._top(candidates, limit)
+
+        return [{'value': self._values[index], 'count': self._counts[index]} for index in best]
+
+
+class SuggestionIndex:
+    """
+    Индексы подсказок по адресам и районам в памяти процесса.
+
+    Строятся из уникальных значений с частотами одним GROUP BY на поле и пересобираются,
+    когда меняется версия объектов (сигналы Object), но не чаще SUGGEST_REFRESH_INTERVAL.
+    Первое построение синхронное, последующие — в фоновом потоке: до их завершения
+    запросы обслуживает прежний индекс.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = _NOT_LOADED
+        self._built_at = 0.0
+        self._indexes = {}
+        self._rebuilding = False
+
+    def _is_fresh(self, version):
+        if self._version is _NOT_LOADED:
+            return False
+        return version == self._version or time.monotonic() - self._built_at < SUGGEST_REFRESH_INTERVAL
+
+    def _build(self, version):
+        from .models import Object
+
+        indexes = {}
+        for field in SUGGEST_FIELDS:
+            counts = dict(
+                Object.objects.exclude(**{field: ''})
+                .order_by()
+                .values_list(field)
+                .annotate(count=Count('id'))
+            )
+            indexes[field] = PrefixIndex(counts)
+        self._indexes = indexes
+        self._version = version
+        self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self, version):
+        try:
+            self._build(version)
+        except Exception:
+            logger.exception('Не удалось пересобрать индекс подсказок')
+        finally:
+            self._rebuilding = False
+            connection.close()
+
+    def _refresh(self):
+        version = get_objects_version()
+        if self._is_fresh(version):
+            return
+
+        if self._version is _NOT_LOADED:
+            with self._lock:
+                if self._version is _NOT_LOADED:
+                    self._build(version)
+            return
+
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, args=(version,), daemon=True).start()
+
+    def suggest(self, field, prefix, limit=SUGGEST_DEFAULT_LIMIT):
+        self._refresh()
+        return self._indexes[field].search(prefix, limit)
+
+
+suggestion_index = SuggestionIndex()
@@ -1,3 +1,1140 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from ..api import renderers
+from ..api.compact import CompactObjectSerializer, object_rows
+from ..api.serializers import ObjectSerializer
+from ..cache import bump_version, bump_objects_version
+from ..images import VARIANT_FORMAT, process_photo
+from ..media import MEDIA_TOKEN_MAX_AGE, MEDIA_TOKEN_STEP
+from ..models import Status, Object, ObjectStat, History, Comment, CommentPhoto, StoredFile
+from ..registry import MISS_RELOAD_INTERVAL, STATUSES_VERSION_KEY, status_registry
+from ..snapshots import create_checkpoint
+from ..sql import refresh_object_stats
+from ..suggest import SUGGEST_MAX_LIMIT, PrefixIndex, SuggestionIndex
+from ...users.models import Role, User
 
-# Create your tests here.
+
+def make_object(status, responsible, **fields):
+    """Несохранённый объект с заполненными обязательными полями."""
+    values = {
+        'title': 'Объект',
+        'address': 'ул. Светланская, 1',
+        'coordinates': Point(131.8853, 43.1155, srid=4326),
+        'status': status,
+        'responsible': responsible,
+        'start_date': date(2025, 1, 1),
+        'end_date': date(2025, 12, 31),
+    }
+    values.update(fields)
+    return Object(**values)
+
+
+class ObjectFixtureMixin:
+    """Администратор user, статус status и объект object, за который он отвечает."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        cls.status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        cls.object = make_object(cls.status, cls.user)
+        cls.object.save()
+
+
+class ObjectHistoryTests(ObjectFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.statuses = [cls.status] + [
+            Status.objects.create(name=f'Статус {i}', color=f'#00000{i}', order=i + 1)
+            for i in range(1, 3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('object-history', args=[self.object.pk])
+
+    def _add_status_changes(self, count):
+        History.objects.bulk_create([
+            History(
+                object=self.object,
+                changed_by=self.user,
+                field_name='status',
+                old_value=self.statuses[i % 3].name,
+                new_value=self.statuses[(i + 1) % 3].name,
+            )
+            for i in range(count)
+        ])
+
+    def test_history_query_count_does_not_depend_on_length(self):
+        self._add_status_changes(3)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 3)
+
+        self._add_status_changes(30)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 33)
+
+    def test_history_contains_new_status_color(self):
+        self._add_status_changes(1)
+        History.objects.create(object=self.object, field_name='title', old_value='А', new_value='Б')
+
+        response = self.client.get(self.url)
+
+        colors = {item['field_name']: item['new_status_color'] for item in response.data}
+        self.assertEqual(colors['status'], self.statuses[1].color)
+        self.assertIsNone(colors['title'])
+
+
+class StatusListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.MASTER)
+        cls.user = User.objects.create_user('master', password='password', role=role)
+        Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        Status.objects.create(name='В работе', color='#007bff', order=2)
+
+    def setUp(self):
+        # on_commit внутри TestCase не выполняется, реестр сбрасываем вручную
+        bump_version(STATUSES_VERSION_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('status-list')
+
+    def test_repeat_request_with_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_status_change_invalidates_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Status.objects.create(name='Завершён', color='#28a745', order=3)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Завершён', [item['name'] for item in response.data['results']])
+
+
+class ObjectKeysetPaginationTests(ObjectFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # вместе с объектом из ObjectFixtureMixin — 25 объектов
+        Object.objects.bulk_create([
+            make_object(cls.status, cls.user, title=f'Объект {i}', address=f'ул. Светланская, {i}')
+            for i in range(1, 25)
+        ])
+        # Одинаковый created_at у части объектов: порядок должен держаться на id
+        Object.objects.filter(id__in=Object.objects.order_by('id').values('id')[:10]).update(
+            created_at=Object.objects.order_by('id').first().created_at
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('object-list')
+
+    def test_cursor_pages_cover_all_objects_once(self):
+        seen = []
+        params = {'pagination': 'cursor', 'page_size': 7}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+
+        expected = list(Object.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_number_without_count(self):
+        response = self.client.get(self.url, {'count': 'false', 'page': 3})
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+
+class PrefixIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = PrefixIndex({
+            'ул. Светланская, 1': 5,
+            'ул. Светлая, 3': 9,
+            'ул. Алеутская, 15': 7,
+            'пр-т Столетия Владивостока, 10': 2,
+        })
+
+    def test_matches_any_word_ordered_by_frequency(self):
+        values = [item['value'] for item in self.index.search('свет')]
+        self.assertEqual(values, ['ул. Светлая, 3', 'ул. Светланская, 1'])
+
+        values = [item['value'] for item in self.index.search('Владивост')]
+        self.assertEqual(values, ['пр-т Столетия Владивостока, 10'])
+
+    def test_limit_and_no_matches(self):
+        self.assertEqual(len(self.index.search('ул', limit=2)), 2)
+        self.assertEqual(self.index.search('океанский'), [])
+
+
+class ObjectSuggestTests(ObjectFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # вместе с объектом из ObjectFixtureMixin — три объекта на Светланской
+        Object.objects.bulk_create([
+            make_object(cls.status, cls.user, address=address, region=region)
+            for address, region in [
+                ('ул. Светланская, 1', 'Ленинский'),
+                ('ул. Светланская, 1', 'Ленинский'),
+                ('ул. Светлая, 3', 'Первореченский'),
+                ('ул. Алеутская, 15', ''),
+            ]
+        ])
+        cls.master = User.objects.create_user('master', password='password', role=Role.objects.create(name=Role.MASTER))
+
+    def setUp(self):
+        # Индекс общий для процесса: свежий экземпляр строится из данных этого теста
+        patcher = mock.patch('apps.objects.api.views.suggestion_index', SuggestionIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('object-suggest')
+
+    def test_ordered_by_frequency(self):
+        response = self.client.get(self.url, {'field': 'address', 'q': 'Свет'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'value': 'ул. Светланская, 1', 'count': 3},
+            {'value': 'ул. Светлая, 3', 'count': 1},
+        ])
+        response = self.client.get(self.url, {'field': 'region', 'q': 'лен', 'limit': 1})
+        self.assertEqual(response.data['results'], [{'value': 'Ленинский', 'count': 2}])
+
+    def test_invalid_params(self):
+        for params in [{'field': 'title', 'q': 'Объект'}, {'field': 'address'},
+                       {'field': 'address', 'q': 'ул', 'limit': 0},
+                       {'field': 'address', 'q': 'ул', 'limit': SUGGEST_MAX_LIMIT + 1}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_master_is_forbidden(self):
+        self.client.force_authenticate(self.master)
+        self.assertEqual(self.client.get(self.url, {'field': 'address', 'q': 'ул'}).status_code, 403)
+
+
+class ObjectImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ADMIN)
+        cls.user = User.objects.create_user('admin', password='password', role=role)
+        Status.objects.create(name='В работе', color='#007bff', order=1)
+
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('object-import')
+
+    def test_csv_import_creates_valid_rows_and_reports_errors(self):
+        content = (
+            'Название;Адрес;Статус;Ответственный;Начало работ;Окончание работ;Долгота;Широта\n'
+            'Сквер;ул. Светланская, 1;В работе;admin;01.02.2025;2025-03-01;131.88;43.11\n'
+            'Парк;ул. Алеутская, 2;В работе;admin;01.04.2025;01.03.2025;131.89;43.12\n'
+            'Мост;ул. Океанская, 3;Нет такого;admin;01.02.2025;01.03.2025;200;43.12\n'
+        ).encode('utf-8')
+        upload = SimpleUploadedFile('objects.csv', content, content_type='text/csv')
+
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total'], response.data['created'], response.data['failed']), (3, 1, 2))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4])
+        self.assertIn('end_date', response.data['errors'][0]['errors'])
+        self.assertEqual(set(response.data['errors'][1]['errors']), {'status', 'coordinates'})
+        self.assertTrue(Object.objects.get(title='Сквер').code.startswith('OBJ-'))
+
+    def _create_through_api(self, title):
+        response = self.client.post(reverse('object-list'), {
+            'title': title,
+            'address': 'ул. Светланская, 1',
+            'coordinates_input': [131.88, 43.11],
+            'status_id': Status.objects.get().id,
+            'responsible_id': self.user.id,
+            'start_date': '2025-02-01',
+            'end_date': '2025-03-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['code']
+
+    def test_imported_code_advances_sequence(self):
+        number = int(self._create_through_api('Первый')[len('OBJ-'):])
+        # Ровно тот код, который база выдала бы следующим
+        next_code = f'OBJ-{number + 1:05d}'
+        content = (
+            'Код;Название;Адрес;Статус;Ответственный;Начало работ;Окончание работ;Долгота;Широта\n'
+            f'{next_code};Сквер;ул. Светланская, 1;В работе;admin;01.02.2025;01.03.2025;131.88;43.11\n'
+        ).encode('utf-8')
+        upload = SimpleUploadedFile('objects.csv', content, content_type='text/csv')
+        self.assertEqual(self.client.post(self.url, {'file': upload}, format='multipart').data['created'], 1)
+
+        code = self._create_through_api('Следующий')
+
+        self.assertNotEqual(code, next_code)
+        self.assertGreater(int(code[len('OBJ-'):]), number + 1)
+
+    def test_geojson_feature_collection(self):
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [131.88 + i / 100, 43.11]},
+                'properties': {
+                    'title': f'Объект {i}', 'address': 'ул. Светланская, 1', 'status': 'В работе',
+                    'responsible': 'admin', 'start_date': '2025-02-01', 'end_date': '2025-03-01',
+                },
+            }
+            for i in range(3)
+        ]
+        content = json.dumps({'type': 'FeatureCollection', 'name': 'objects', 'features': features}).encode()
+        upload = SimpleUploadedFile('objects.geojson', content, content_type='application/geo+json')
+
+        with mock.patch('apps.objects.importers.IMPORT_JSON_CHUNK_SIZE', 16):
+            response = self.client.post(self.url, {'file': upload}, format='multipart')
+
+        self.assertEqual((response.data['total'], response.data['created']), (3, 3))
+
+
+OBJECT_CODE = re.compile(r'^OBJ-\d{5,}$')
+
+
+class ObjectCodeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        cls.status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+
+    def test_code_is_assigned_by_insert(self):
+        obj = make_object(self.status, self.user)
+        # Код приходит из RETURNING того же INSERT — отдельного запроса нет
+        with self.assertNumQueries(1):
+            obj.save()
+        self.assertRegex(obj.code, OBJECT_CODE)
+        self.assertEqual(Object.objects.get(pk=obj.pk).code, obj.code)
+
+
+class ObjectCodeConcurrencyTests(TransactionTestCase):
+    def test_concurrent_bulk_creates_get_distinct_codes(self):
+        user = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        barrier = threading.Barrier(4)
+
+        def create_batch(_):
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    return [obj.code for obj in Object.objects.bulk_create([make_object(status, user) for _ in range(50)])]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            returned = [code for codes in pool.map(create_batch, range(4)) for code in codes]
+
+        codes = list(Object.objects.values_list('code', flat=True))
+        self.assertEqual(sorted(returned), sorted(codes))
+        self.assertEqual(len(set(codes)), 200)
+        self.assertTrue(all(OBJECT_CODE.match(code) for code in codes))
+
+
+class BulkUpdateStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = User.objects.create_user('master', password='password', role=Role.objects.create(name=Role.MASTER))
+        cls.other = User.objects.create_user('other', password='password', role=Role.objects.get(name=Role.MASTER))
+        cls.planned = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        cls.done = Status.objects.create(name='Завершён', color='#28a745', order=2)
+
+        cls.own = Object.objects.bulk_create([make_object(cls.planned, cls.master) for _ in range(3)])
+        cls.own_done, cls.foreign = Object.objects.bulk_create([
+            make_object(cls.done, cls.master),
+            make_object(cls.planned, cls.other),
+        ])
+
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.master)
+        self.url = reverse('object-bulk-update-status')
+
+    def test_updates_own_objects_and_writes_history(self):
+        ids = [obj.id for obj in self.own] + [self.own_done.id, self.foreign.id]
+
+        response = self.client.post(self.url, {'ids': ids, 'status_id': self.done.id}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(response.data['unchanged'], 1)
+        self.assertEqual(response.data['not_found'], [self.foreign.id])
+        self.assertEqual(Object.objects.filter(status=self.done, responsible=self.master).count(), 4)
+        self.assertEqual(Object.objects.get(id=self.foreign.id).status, self.planned)
+        self.assertEqual(
+            History.objects.filter(field_name='status', old_value='Планируется', new_value='Завершён').count(), 3
+        )
+
+
+class ObjectChangeTrackingTests(ObjectFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = User.objects.create_user('ivanov', password='password', role=Role.objects.create(name=Role.MASTER))
+
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_update_records_each_changed_field(self):
+        response = self.client.patch(
+            reverse('object-detail', args=[self.object.pk]),
+            {'title': 'Новое название', 'responsible_id': self.other.pk, 'end_date': '2025-12-31'},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        changes = {
+            item.field_name: (item.old_value, item.new_value, item.changed_by_id)
+            for item in History.objects.filter(object=self.object)
+        }
+        self.assertEqual(changes, {
+            'title': ('Объект', 'Новое название', self.user.pk),
+            'responsible': ('admin', 'ivanov', self.user.pk),
+        })
+
+    def test_save_without_changes_writes_nothing(self):
+        obj = Object.objects.get(pk=self.object.pk)
+        with self.assertNumQueries(1):
+            obj.save()
+        self.assertFalse(History.objects.exists())
+
+
+class ObjectAsOfTests(ObjectFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.in_progress = Status.objects.create(name='В работе', color='#007bff', order=2)
+        Object.objects.filter(pk=cls.object.pk).update(created_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('object-as-of', args=[self.object.pk])
+
+        obj = Object.objects.get(pk=self.object.pk)
+        obj.status = self.in_progress
+        obj.save()
+        History.objects.filter(object=obj).update(changed_at=datetime(2025, 6, 1, tzinfo=dt_timezone.utc))
+
+    def test_state_is_rewound_from_current(self):
+        self.assertEqual(self.client.get(self.url, {'t': '2025-05-01'}).data['status'], 'Планируется')
+        self.assertEqual(self.client.get(self.url, {'t': '2025-07-01'}).data['status_id'], self.in_progress.id)
+        self.assertEqual(self.client.get(self.url, {'t': '2024-12-01'}).status_code, 404)
+
+    def test_state_is_rewound_from_checkpoint(self):
+        create_checkpoint()
+        response = self.client.get(reverse('object-as-of-bulk'), {'t': '2025-05-01T12:00:00Z'})
+        self.assertEqual(
+            [(item['id'], item['status'], item['responsible']) for item in response.data['results']],
+            [(self.object.pk, 'Планируется', 'admin')],
+        )
+
+
+class ObjectPhotoProcessingTests(ObjectFixtureMixin, TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('object-detail', args=[self.object.pk])
+
+    def _upload_photo(self, size, orientation=1):
+        image = Image.new('RGB', size, (200, 50, 50))
+        exif = image.getexif()
+        exif[0x0112] = orientation
+        content = io.BytesIO()
+        image.save(content, 'JPEG', exif=exif)
+        photo = SimpleUploadedFile('photo.jpg', content.getvalue(), content_type='image/jpeg')
+        response = self.client.patch(self.url, {'main_photo': photo}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+
+    def test_variants_fall_back_to_original_until_processed(self):
+        self._upload_photo((800, 600))
+
+        data = self.client.get(self.url).data
+        self.assertEqual(data['main_photo_variants'], {'medium': data['main_photo_url'], 'thumb': data['main_photo_url']})
+
+    def test_photo_is_rotated_downscaled_and_gets_variants(self):
+        self._upload_photo((4000, 3000), orientation=6)
+        process_photo(Object, self.object.pk)
+
+        self.object.refresh_from_db()
+        with Image.open(self.object.main_photo.path) as image:
+            self.assertEqual(image.size, (1920, 2560))
+        thumb = self.object.main_photo.storage.path(self.object.main_photo_variants['thumb'])
+        with Image.open(thumb) as image:
+            self.assertEqual((image.format, image.size), (VARIANT_FORMAT, (240, 320)))
+        data = self.client.get(self.url).data
+        self.assertNotEqual(data['main_photo_variants']['medium'], data['main_photo_url'])
+
+    def test_replaced_photo_is_released(self):
+        self._upload_photo((800, 600))
+        self.object.refresh_from_db()
+        old_name, old_path = self.object.main_photo.name, self.object.main_photo.path
+
+        with mock.patch('apps.objects.signals.schedule_processing'), self.captureOnCommitCallbacks(execute=True):
+            self._upload_photo((640, 480))
+
+        self.object.refresh_from_db()
+        self.assertNotEqual(self.object.main_photo.name, old_name)
+        self.assertFalse(StoredFile.objects.filter(name=old_name).exists())
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(StoredFile.objects.filter(name=self.object.main_photo.name, ref_count=1).exists())
+
+
+class CommentPhotoUploadTests(ObjectFixtureMixin, TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_settings = self.settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _photo(self):
+        # Случайные пиксели: у каждого фото своё содержимое, а значит и свой файл в хранилище
+        content = io.BytesIO()
+        Image.frombytes('RGB', (16, 16), os.urandom(16 * 16 * 3)).save(content, 'PNG')
+        return content.getvalue()
+
+    def _post_comment(self, photos):
+        return self.client.post(
+            reverse('comment-list'),
+            {
+                'object': self.object.pk,
+                'text': 'Фото с объекта',
+                'photo_files': [
+                    SimpleUploadedFile(f'photo_{i}.png', photo, content_type='image/png')
+                    for i, photo in enumerate(photos)
+                ],
+            },
+            format='multipart',
+        )
+
+    def _stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+    def test_photos_are_stored_in_order(self):
+        photos = [self._photo() for _ in range(3)]
+        response = self._post_comment(photos)
+
+        self.assertEqual(response.status_code, 201)
+        names = list(CommentPhoto.objects.order_by('pk').values_list('photo', flat=True))
+        self.assertEqual(
+            [os.path.basename(name) for name in names],
+            [f'{hashlib.sha256(photo).hexdigest()}.png' for photo in photos],
+        )
+        self.assertEqual(len(self._stored_files()), 3)
+
+    def test_duplicate_photo_is_stored_once_and_removed_with_last_reference(self):
+        photo = self._photo()
+        first = self._post_comment([photo]).data['id']
+        second = self._post_comment([photo]).data['id']
+
+        name = CommentPhoto.objects.get(comment_id=first).photo.name
+        self.assertEqual(CommentPhoto.objects.get(comment_id=second).photo.name, name)
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 2)
+        self.assertEqual(len(self._stored_files()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.get(pk=first).delete()
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 1)
+        self.assertEqual(len(self._stored_files()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.get(pk=second).delete()
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertEqual(self._stored_files(), [])
+
+    def test_failed_insert_removes_stored_files(self):
+        with mock.patch.object(CommentPhoto.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self._post_comment([self._photo() for _ in range(3)])
+
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual(self._stored_files(), [])
+
+    def test_failed_insert_keeps_shared_file(self):
+        shared = self._photo()
+        self._post_comment([shared])
+        name = CommentPhoto.objects.get().photo.name
+
+        with mock.patch.object(CommentPhoto.objects, 'bulk_create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self._post_comment([shared, self._photo()])
+
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(list(StoredFile.objects.values_list('name', 'ref_count')), [(name, 1)])
+        self.assertEqual(self._stored_files(), [os.path.basename(name)])
+
+
+class MediaFileViewTests(ObjectFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.master = User.objects.create_user('master', password='password', role=Role.objects.create(name=Role.MASTER))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        content = io.BytesIO()
+        Image.frombytes('RGB', (16, 16), os.urandom(16 * 16 * 3)).save(content, 'PNG')
+        self.content = content.getvalue()
+        self.object.main_photo.save('photo.png', ContentFile(self.content))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.url = client.get(reverse('object-detail', args=[self.object.pk])).data['main_photo_url']
+
+    def test_photo_is_served_by_link_token(self):
+        response = APIClient().get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['ETag'], f'"{hashlib.sha256(self.content).hexdigest()}"')
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertEqual(APIClient().get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertIn(APIClient().get(self.url + 'x').status_code, (401, 403))
+
+    def test_range_request_returns_partial_content(self):
+        response = APIClient().get(self.url, HTTP_RANGE='bytes=0-9')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 0-9/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[:10])
+
+    def test_token_opens_only_its_file(self):
+        other = make_object(self.status, self.user, title='Другой объект', address='ул. Алеутская, 2')
+        other.save()
+        other.main_photo.save('other.png', ContentFile(self.content + b'x'))
+        path = reverse('media-file', args=['objects', other.pk, other.main_photo.name])
+        token = self.url.split('?')[1]
+
+        self.assertIn(APIClient().get(f'{path}?{token}').status_code, (401, 403))
+
+    def test_token_expires(self):
+        expired = time.time() + MEDIA_TOKEN_MAX_AGE + 2 * MEDIA_TOKEN_STEP
+        with mock.patch('time.time', return_value=expired):
+            self.assertIn(APIClient().get(self.url).status_code, (401, 403))
+
+    def test_links_keep_script_name(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(reverse('object-detail', args=[self.object.pk]), SCRIPT_NAME='/gis').data
+
+        self.assertIn('/gis/api/media/objects/', data['main_photo_url'])
+
+    def test_master_cannot_see_photo_of_other_responsible(self):
+        client = APIClient()
+        client.force_authenticate(self.master)
+
+        self.assertEqual(client.get(self.url.split('?')[0]).status_code, 404)
+
+
+class ObjectStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.MASTER)
+        cls.master = User.objects.create_user('master', password='password', role=role)
+        cls.other = User.objects.create_user('other', password='password', role=role)
+        cls.manager = User.objects.create_user('manager', password='password', role=Role.objects.create(name=Role.MANAGER))
+        cls.planned = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        cls.done = Status.objects.create(name='Завершён', color='#28a745', order=2)
+
+    def assertStatsMatchObjects(self):
+        expected = {
+            (row['region'], row['status_id'], row['responsible_id']): row['count']
+            for row in Object.objects.order_by().values('region', 'status_id', 'responsible_id').annotate(count=Count('id'))
+        }
+        actual = {
+            (stat.region, stat.status_id, stat.responsible_id): stat.count
+            for stat in ObjectStat.objects.exclude(count=0)
+        }
+        self.assertEqual(actual, expected)
+
+    def _create_objects(self):
+        first = make_object(self.planned, self.master, region='Ленинский')
+        first.save()
+        Object.objects.bulk_create([
+            make_object(self.planned, self.master, region='Ленинский'),
+            make_object(self.planned, self.other, region='Фрунзенский'),
+            make_object(self.done, self.other, region='Фрунзенский'),
+        ])
+        return first
+
+    def test_counts_follow_every_change(self):
+        obj = self._create_objects()
+        self.assertStatsMatchObjects()
+
+        obj.status = self.done
+        obj.save()
+        self.assertStatsMatchObjects()
+
+        obj.responsible = self.other
+        obj.save()
+        self.assertStatsMatchObjects()
+
+        # UPDATE без смены района, статуса и ответственного сводку не меняет
+        obj.title = 'Новое название'
+        obj.save()
+        Object.objects.update(description='Описание')
+        self.assertStatsMatchObjects()
+
+        Object.objects.filter(status=self.planned).update(status=self.done)
+        self.assertStatsMatchObjects()
+
+        obj.delete()
+        self.assertStatsMatchObjects()
+        Object.objects.filter(responsible=self.other).delete()
+        self.assertStatsMatchObjects()
+        self.assertFalse(ObjectStat.objects.filter(count__lt=0).exists())
+
+    def test_refresh_rebuilds_summary(self):
+        self._create_objects()
+        Object.objects.filter(status=self.done).delete()
+        ObjectStat.objects.update(count=100)
+
+        refresh_object_stats()
+
+        self.assertStatsMatchObjects()
+        self.assertFalse(ObjectStat.objects.filter(count=0).exists())
+
+    def test_endpoint_reads_summary_within_role_scope(self):
+        self._create_objects()
+        client = APIClient()
+
+        client.force_authenticate(self.manager)
+        response = client.get(reverse('object-stats'), {'group_by': 'status'})
+        self.assertEqual(response.data['total'], 4)
+        self.assertEqual({row['status_id']: row['count'] for row in response.data['results']}, {
+            self.planned.id: 3, self.done.id: 1,
+        })
+
+        client.force_authenticate(self.master)
+        response = client.get(reverse('object-stats'), {'group_by': 'region'})
+        self.assertEqual(response.data['results'], [{'region': 'Ленинский', 'count': 2}])
+
+
+class ObjectSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        cls.square = make_object(status, cls.user, title='Озеленение сквера', address='ул. Светланская, 15')
+        cls.fountain = make_object(
+            status, cls.user, title='Ремонт', description='Замена насосов фонтанов', address='ул. Алеутская, 2',
+        )
+        cls.coded = make_object(status, cls.user, title='Дорога', code='TST-12345', address='пр-т Океанский, 7')
+        for obj in (cls.square, cls.fountain, cls.coded):
+            obj.save()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        response = self.client.get(reverse('object-list'), {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def test_full_text_on_title_and_description(self):
+        self.assertEqual(self.search('сквер'), {self.square.id})
+        self.assertEqual(self.search('фонтан'), {self.fountain.id})
+
+    def test_address_with_typo(self):
+        self.assertEqual(self.search('Светлансая'), {self.square.id})
+
+    def test_code_exact_and_partial(self):
+        self.assertEqual(self.search('TST-12345'), {self.coded.id})
+        self.assertEqual(self.search('2345'), {self.coded.id})
+
+    def test_trigger_refreshes_vector_on_update(self):
+        Object.objects.filter(pk=self.coded.pk).update(title='Реконструкция набережной')
+
+        self.assertEqual(self.search('набережная'), {self.coded.id})
+        self.assertEqual(self.search('дорога'), set())
+
+
+def tile_of(lng, lat, z):
+    n = 2 ** z
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return z, x, y
+
+
+class ObjectTileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.MASTER)
+        cls.master = User.objects.create_user('master', password='password', role=role)
+        other = User.objects.create_user('other', password='password', role=role)
+        status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        make_object(status, cls.master, code='TST-OWN').save()
+        make_object(status, other, code='TST-FOREIGN').save()
+
+    def setUp(self):
+        # Версия объектов в тестах не растёт (on_commit не выполняется) — сбрасываем кеш тайлов сами
+        bump_objects_version()
+        self.client = APIClient()
+        self.client.force_authenticate(self.master)
+
+    def get_tile(self, z, x, y, **extra):
+        return self.client.get(reverse('object-tiles', args=[z, x, y]), **extra)
+
+    def test_out_of_range_tile(self):
+        self.assertEqual(self.get_tile(2, 4, 0).status_code, 400)
+        self.assertEqual(self.get_tile(23, 0, 0).status_code, 400)
+
+    def test_empty_tile(self):
+        # Противоположная сторона Земли
+        response = self.get_tile(*tile_of(-48.0, -43.0, 10))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+
+    def test_master_sees_only_own_objects(self):
+        response = self.get_tile(*tile_of(131.8853, 43.1155, 10))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        # Строковые значения атрибутов лежат в MVT как есть
+        self.assertIn(b'TST-OWN', response.content)
+        self.assertNotIn(b'TST-FOREIGN', response.content)
+
+    def test_etag_revalidation(self):
+        tile = tile_of(131.8853, 43.1155, 10)
+        etag = self.get_tile(*tile)['ETag']
+
+        self.assertEqual(self.get_tile(*tile, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        bump_objects_version()
+        self.assertEqual(self.get_tile(*tile, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ObjectExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        cls.master = User.objects.create_user('master', password='password', role=Role.objects.create(name=Role.MASTER))
+        cls.planned = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        cls.done = Status.objects.create(name='Завершён', color='#28a745', order=2)
+        cls.own = make_object(cls.planned, cls.master, title='Сквер', coordinates=Point(131.5, 43.25, srid=4326))
+        cls.own.save()
+        make_object(cls.done, cls.master, title='Парк').save()
+        make_object(cls.planned, cls.admin, title='Мост').save()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def export(self, user, export_format, params=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse('object-export', kwargs={'export_format': export_format}), params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_geojson_feature_collection(self):
+        response, content = self.export(self.admin, 'geojson')
+
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        self.assertIn('objects.geojson', response['Content-Disposition'])
+        data = json.loads(content)
+        self.assertEqual(data['type'], 'FeatureCollection')
+        self.assertEqual(len(data['features']), 3)
+        feature = next(feature for feature in data['features'] if feature['id'] == self.own.id)
+        self.assertEqual(feature['geometry'], {'type': 'Point', 'coordinates': [131.5, 43.25]})
+        self.assertEqual(feature['properties']['title'], 'Сквер')
+        self.assertEqual(feature['properties']['status'], 'Планируется')
+        self.assertEqual(feature['properties']['responsible'], 'master')
+        self.assertEqual(feature['properties']['start_date'], '2025-01-01')
+
+    def test_ndjson_is_scoped_and_filtered(self):
+        _, content = self.export(self.master, 'ndjson')
+        titles = {json.loads(line)['properties']['title'] for line in content.splitlines()}
+        self.assertEqual(titles, {'Сквер', 'Парк'})
+
+        _, content = self.export(self.master, 'ndjson', {'status': self.planned.id})
+        self.assertEqual([json.loads(line)['id'] for line in content.splitlines()], [self.own.id])
+
+    def test_empty_export_is_valid_geojson(self):
+        _, content = self.export(self.admin, 'geojson', {'status': 0})
+        self.assertEqual(json.loads(content)['features'], [])
+
+
+class ObjectClusterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        cls.master = User.objects.create_user('master', password='password', role=Role.objects.create(name=Role.MASTER))
+        cls.planned = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        cls.done = Status.objects.create(name='Завершён', color='#28a745', order=2)
+        # два объекта во Владивостоке и один в Москве
+        make_object(cls.planned, cls.master, coordinates=Point(131.88, 43.11, srid=4326)).save()
+        make_object(cls.done, cls.master, coordinates=Point(131.90, 43.12, srid=4326)).save()
+        cls.moscow = make_object(cls.planned, cls.admin, coordinates=Point(37.62, 55.75, srid=4326))
+        cls.moscow.save()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('object-clusters')
+
+    def clusters(self, user, params):
+        self.client.force_authenticate(user)
+        return self.client.get(self.url, params)
+
+    def test_invalid_params(self):
+        for params in [{}, {'zoom': 23}, {'zoom': -1}, {'zoom': 2, 'bbox': 'a,b'},
+                       {'zoom': 2, 'bbox': '140,40,130,50'}, {'zoom': 2, 'bbox': '0,0,200,10'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.clusters(self.admin, params).status_code, 400)
+
+    def test_status_counts_per_cell(self):
+        response = self.clusters(self.admin, {'zoom': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        clusters = sorted(response.data['clusters'], key=lambda cluster: cluster['count'])
+        self.assertEqual(len(clusters), 2)
+        self.assertEqual(clusters[0]['statuses'], {self.planned.id: 1})
+        self.assertEqual(clusters[0]['id'], self.moscow.id)
+        self.assertEqual(clusters[1]['statuses'], {self.planned.id: 1, self.done.id: 1})
+        self.assertIsNone(clusters[1]['id'])
+
+    def test_bbox_limits_clusters(self):
+        response = self.clusters(self.admin, {'zoom': 2, 'bbox': '30,50,40,60'})
+
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['clusters'][0]['id'], self.moscow.id)
+
+    def test_master_sees_own_objects_only(self):
+        response = self.clusters(self.master, {'zoom': 2})
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['clusters']), 1)
+
+
+class ObjectMapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        cls.status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        cls.vladivostok = make_object(cls.status, cls.admin, coordinates=Point(131.8853, 43.1155, srid=4326))
+        cls.vladivostok.save()
+        make_object(cls.status, cls.admin, coordinates=Point(37.6173, 55.7558, srid=4326)).save()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('object-map')
+
+    def test_bbox_filters_points(self):
+        response = self.client.get(self.url, {'bbox': '130,42,133,44'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertFalse(response.data['truncated'])
+        self.assertEqual(response.data['results'], [{
+            'id': self.vladivostok.id,
+            'lng': 131.8853,
+            'lat': 43.1155,
+            'status_id': self.status.id,
+            'code': self.vladivostok.code,
+        }])
+
+    def test_zoom_rounds_coordinates(self):
+        response = self.client.get(self.url, {'bbox': '130,42,133,44', 'zoom': 2})
+
+        point = response.data['results'][0]
+        self.assertEqual((point['lng'], point['lat']), (131.9, 43.1))
+
+    def test_truncated(self):
+        with mock.patch('apps.objects.api.views.MAP_MAX_FEATURES', 1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data['count'], 1)
+        self.assertTrue(response.data['truncated'])
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_invalid_bbox(self):
+        self.assertEqual(self.client.get(self.url, {'bbox': '1,2,3'}).status_code, 400)
+
+
+class CompactObjectSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+        # объект с фото и вариантами и объект с пустыми необязательными полями
+        cls.with_photo = make_object(status, cls.admin, description='Ремонт', region='Ленинский')
+        cls.with_photo.save()
+        Object.objects.filter(pk=cls.with_photo.pk).update(
+            main_photo='objects/photos/2025/01/photo.jpg',
+            main_photo_variants={'thumb': 'objects/photos/2025/01/photo_thumb.webp'},
+        )
+        make_object(status, cls.admin, description='', region='').save()
+
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+
+    def test_same_output_as_object_serializer(self):
+        request = APIRequestFactory().get('/api/objects/')
+        request.user = self.admin
+        queryset = Object.objects.order_by('id')
+
+        with mock.patch('time.time', return_value=1_700_000_000):
+            compact = CompactObjectSerializer(context={'request': request}).serialize(object_rows(queryset))
+            full = ObjectSerializer(queryset, many=True, context={'request': request}).data
+
+        self.assertEqual(json.loads(json.dumps(compact)), json.loads(json.dumps(full)))
+        self.assertIsNotNone(compact[0]['main_photo'])
+        self.assertIsNone(compact[1]['main_photo'])
+
+    def test_status_missing_from_registry_snapshot(self):
+        status_registry.all()
+        status = Status.objects.create(name='В работе', color='#007bff', order=2)
+        Object.objects.filter(pk=self.with_photo.pk).update(status=status)
+        serializer = CompactObjectSerializer()
+        # снимок реестра сделан до появления статуса, версия в кеше не менялась
+        self.assertNotIn(status.id, serializer.statuses)
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + MISS_RELOAD_INTERVAL):
+            data = serializer.serialize(object_rows(Object.objects.filter(pk=self.with_photo.pk)))
+
+        self.assertEqual(data[0]['status']['name'], 'В работе')
+
+
+class RendererTests(SimpleTestCase):
+    data = {
+        'created_at': datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'local': datetime(2025, 3, 1, 12, 30, tzinfo=dt_timezone(timedelta(hours=10))),
+        'naive': datetime(2025, 3, 1, 12, 0),
+        'date': date(2025, 3, 1),
+        'amount': Decimal('12.50'),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy('Статус'),
+        'items': [1, None, True, 'строка\u2028с разделителем'],
+        5: 'ключ-число',
+    }
+
+    def test_fast_json_matches_drf(self):
+        self.assertEqual(renderers.FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_fast_json_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    @unittest.skipUnless(renderers.msgpack, 'msgpack не установлен')
+    def test_msgpack_matches_json(self):
+        data = {key: value for key, value in self.data.items() if key != 5}
+        unpacked = renderers.msgpack.unpackb(renderers.MessagePackRenderer().render(data))
+        self.assertEqual(unpacked, json.loads(JSONRenderer().render(data)))
+
+
+@unittest.skipUnless(renderers.msgpack, 'msgpack не установлен')
+class MessagePackNegotiationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='password', role=Role.objects.create(name=Role.ADMIN))
+        make_object(Status.objects.create(name='Планируется', color='#6c757d', order=1), cls.admin).save()
+
+    def test_accept_msgpack(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('object-list')
+
+        response = client.get(url, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content), client.get(url).json())
+
+
+class StatusRegistryTests(TestCase):
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+        self.status = Status.objects.create(name='Планируется', color='#6c757d', order=1)
+
+    def test_reloads_after_ttl_without_version_bump(self):
+        self.assertEqual(status_registry.get(self.status.id), self.status)
+        version = status_registry.version
+        # update() не вызывает сигналов — так выглядит изменение из другого воркера без общего кеша
+        Status.objects.filter(pk=self.status.pk).update(color='#000000')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(status_registry.get(self.status.id).color, '#6c757d')
+
+        expired = time.monotonic() + status_registry.ttl + 1
+        with mock.patch('time.monotonic', return_value=expired):
+            self.assertEqual(status_registry.get(self.status.id).color, '#000000')
+            self.assertNotEqual(status_registry.version, version)
+
+    def test_unknown_status_reloads_registry(self):
+        status_registry.all()
+        # статус из другого воркера: версия в кеше не менялась и ttl не истёк
+        created = Status.objects.create(name='В работе', color='#007bff', order=2)
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + MISS_RELOAD_INTERVAL):
+            self.assertEqual(status_registry.get(created.id), created)
+            self.assertEqual(status_registry.get_by_name('В работе'), created)
+            self.assertIsNone(status_registry.get(created.id + 1))
@@ -0,0 +1,89 @@
+import hashlib
+import math
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db import connection
+from .cache import get_objects_version
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_LAYER = 'objects'
+TILE_MAX_ZOOM = 22
+TILE_CACHE_TIMEOUT = 60 * 60 * 24
+
+TILE_SQL = """
+    SELECT ST_AsMVT(tile, %s, %s, 'geom') FROM (
+        SELECT
+            ST_AsMVTGeom(
+                ST_Transform(o.coordinates, 3857),
+                ST_TileEnvelope(%s, %s, %s),
+                %s, %s, true
+            ) AS geom,
+            o.id,
+            o.code,
+            o.status_id,
+            s.color AS status_color
+        FROM objects o
+        JOIN statuses s ON s.id = o.status_id
+        WHERE o.id IN ({ids_sql})
+    ) AS tile
+"""
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_bbox(z, x, y, buffer=0.0):
+    """Границы тайла в EPSG:4326, расширенные на долю buffer от размера тайла."""
+    n = 2 ** z
+
+    def lng(tile_x):
+        return tile_x / n * 360.0 - 180.0
+
+    def lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (
+        max(lng(x - buffer), -180.0),
+        max(lat(min(y + 1 + buffer, n)), -90.0),
+        min(lng(x + 1 + buffer), 180.0),
+        min(lat(max(y - buffer, 0)), 90.0),
+    )
+
+
+def tile_cache_key(z, x, y, scope, query_params):
+    filters = '&'.join(
+        f'{key}={value}'
+        for key, values in sorted(query_params.lists())
+        for value in values
+    )
+    filter_hash = hashlib.md5(filters.encode()).hexdigest()
+    return f'objects:tile:{get_objects_version()}:{z}:{x}:{y}:{scope}:{filter_hash}'
+
+
+def render_tile(queryset, z, x, y):
+    envelope = Polygon.from_bbox(tile_bbox(z, x, y, buffer=TILE_BUFFER / TILE_EXTENT))
+    envelope.srid = 4326
+    ids_sql, ids_params = (
+        queryset.order_by()
+        .filter(coordinates__bboverlaps=envelope)
+        .values('id')
+        .query.sql_with_params()
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TILE_SQL.format(ids_sql=ids_sql),
+            [TILE_LAYER, TILE_EXTENT, z, x, y, TILE_EXTENT, TILE_BUFFER, *ids_params],
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else b''
+
+
+def get_tile(queryset, z, x, y, cache_key):
+    tile = cache.get(cache_key)
+    if tile is None:
+        tile = render_tile(queryset, z, x, y)
+        cache.set(cache_key, tile, TILE_CACHE_TIMEOUT)
+    return tile
@@ -0,0 +1,105 @@
+from datetime import date
+
+
+def _comparable(value):
+    # Точки сравниваем по координатам, файлы — по имени: сами объекты не поддерживают ==
+    if value is None:
+        return None
+    if hasattr(value, 'coords'):
+        return tuple(value.coords)
+    if hasattr(value, 'storage'):
+        return value.name or None
+    return value
+
+
+class FieldHistoryMixin:
+    """
+    Пишет изменения полей модели в History.
+
+    При загрузке из БД (from_db) запоминаются значения полей tracked_fields, при save()
+    они сравниваются с текущими, и все изменившиеся поля записываются одним bulk_create.
+    Сохранение без изменений лишних запросов не делает. Автора изменения задают
+    атрибутом _changed_by перед save().
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tracked_snapshot = instance._tracked_values()
+        return instance
+
+    def _tracked_names(self, fields=None):
+        if fields is None:
+            return list(self.tracked_fields)
+        fields = set(fields)
+        return [
+            name for name in self.tracked_fields
+            if name in fields or self._meta.get_field(name).attname in fields
+        ]
+
+    def _tracked_values(self, names=None):
+        deferred = self.get_deferred_fields()
+        values = {}
+        for name in names if names is not None else self.tracked_fields:
+            attname = self._meta.get_field(name).attname
+            if attname not in deferred:
+                values[name] = _comparable(getattr(self, attname))
+        return values
+
+    def _changed_fields(self, update_fields=None):
+        snapshot = getattr(self, '_tracked_snapshot', None)
+        if snapshot is None:
+            return []
+        current = self._tracked_values([name for name in self._tracked_names(update_fields) if name in snapshot])
+        return [(name, snapshot[name], value) for name, value in current.items() if value != snapshot[name]]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+
+        if not adding:
+            changes = self._changed_fields(kwargs.get('update_fields'))
+            if changes:
+                self._write_history(changes)
+        self._tracked_snapshot = self._tracked_values()
+
+    save.alters_data = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if hasattr(self, '_tracked_snapshot'):
+            self._tracked_snapshot.update(self._tracked_values(self._tracked_names(fields)))
+
+    def history_value(self, name, value, related_labels):
+        """Строковое представление значения поля для History."""
+        if value is None:
+            return None
+        field = self._meta.get_field(name)
+        if field.is_relation:
+            return related_labels.get((name, value), str(value))
+        if isinstance(value, tuple):
+            return '[' + ', '.join(str(part) for part in value) + ']'
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+
+    def history_related_labels(self, changes):
+        """Подписи для изменившихся внешних ключей: {(поле, pk): подпись}. Переопределяется в модели."""
+        return {}
+
+    def _write_history(self, changes):
+        from .models import History
+
+        labels = self.history_related_labels(changes)
+        changed_by = getattr(self, '_changed_by', None)
+        History.objects.bulk_create([
+            History(
+                object=self,
+                changed_by=changed_by if getattr(changed_by, 'pk', None) else None,
+                field_name=name,
+                old_value=self.history_value(name, old, labels),
+                new_value=self.history_value(name, new, labels) or '',
+            )
+            for name, old, new in changes
+        ])
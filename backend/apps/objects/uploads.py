@@ -0,0 +1,62 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Пул общий для всех запросов: одновременно пишется не больше UPLOAD_WORKERS файлов
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'UPLOAD_WORKERS', 4),
+    thread_name_prefix='uploads',
+)
+
+
+def _prepare(field, instance, file):
+    # Хранилище пишет файл по чанкам — целиком в памяти он не держится
+    name = field.generate_filename(instance, file.name)
+    return field.storage.prepare(name, file)
+
+
+def delete_unreferenced_files(storage, names):
+    """После отката транзакции удаляет записанные в ней файлы, на которые не осталось ссылок."""
+    for name in names:
+        try:
+            storage.delete_unreferenced(name)
+        except OSError:
+            logger.warning('Не удалось удалить файл %s', name, exc_info=True)
+
+
+def store_files(field, instance, files):
+    """
+    Записывает файлы в хранилище поля field (ContentAddressedStorage) и возвращает их имена
+    в порядке files. Содержимое пишется и хешируется параллельно в пуле, а учёт ссылок идёт
+    в соединении вызывающего кода — в его транзакции, если она открыта: при её откате
+    вызывающий код удаляет файлы через delete_unreferenced_files().
+    Если хоть один файл записать не удалось, учёт ссылок откатывается и ошибка пробрасывается.
+    """
+    storage = field.storage
+    futures = [_executor.submit(_prepare, field, instance, file) for file in files]
+    prepared = []
+    error = None
+    for future in futures:
+        try:
+            prepared.append(future.result())
+        except Exception as exc:
+            error = error or exc
+    if error is not None:
+        for item in prepared:
+            storage.discard(item)
+        raise error
+
+    names = []
+    try:
+        with transaction.atomic():
+            for item in prepared:
+                names.append(storage.save_prepared(item))
+    except Exception:
+        delete_unreferenced_files(storage, names)
+        for item in prepared[len(names):]:
+            storage.discard(item)
+        raise
+    return names
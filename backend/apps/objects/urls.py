@@ -1,12 +1,18 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
-from .api.views import StatusViewSet, ObjectViewSet, CommentViewSet
+from .api.views import StatusViewSet, ObjectViewSet, CommentViewSet, MediaFileView
 
 router = DefaultRouter()
 router.register(r'statuses', StatusViewSet, basename='status')
 router.register(r'objects', ObjectViewSet, basename='object')
 router.register(r'comments', CommentViewSet, basename='comment')
 
+object_tiles = ObjectViewSet.as_view({'get': 'tiles'})
+object_export = ObjectViewSet.as_view({'get': 'export'})
+
 urlpatterns = [
+    path('objects/tiles/<int:z>/<int:x>/<int:y>.pbf', object_tiles, name='object-tiles'),
+    path('media/<slug:kind>/<int:pk>/<path:name>', MediaFileView.as_view(), name='media-file'),
+    re_path(r'^objects/export\.(?P<export_format>geojson|ndjson)$', object_export, name='object-export'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
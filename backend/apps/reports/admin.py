@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import ReportJob
 
-# Register your models here.
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'report_type', 'format', 'user', 'status', 'progress', 'created_at', 'finished_at']
+    list_filter = ['status', 'report_type', 'format']
+    readonly_fields = ['user', 'report_type', 'filters', 'format', 'status', 'progress', 'cache_key',
+                       'result', 'error', 'created_at', 'started_at', 'finished_at']
+    ordering = ['-created_at']
+
+    def has_add_permission(self, request):
+        return False
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.urls import reverse
 from datetime import date
+from ..models import ReportJob
 
 
 class ReportFilterSerializer(serializers.Serializer):
@@ -25,4 +27,24 @@ class ReportRequestSerializer(serializers.Serializer):
             ('xlsx', 'Excel'),
         ],
         default='pdf'
-    )
\ No newline at end of file
+    )
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report_type', 'format', 'filters', 'status', 'status_display',
+            'progress', 'error', 'created_at', 'started_at', 'finished_at', 'download_url',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ReportJob.DONE:
+            return None
+        url = reverse('reports:report-job-download', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
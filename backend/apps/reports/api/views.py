@@ -1,13 +1,25 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions, status
-from django.http import FileResponse, HttpResponse
-from django.template.loader import render_to_string
-from django.db.models import Count, Case, When, Value, CharField, Q
-from datetime import datetime, date
-from io import BytesIO
-from ...objects.models import Object
-from .serializers import ReportRequestSerializer
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from datetime import date
+import tempfile
+from ..builders import REPORT_BUILDERS, build_report_data, count_report_rows
+from ..generators import REPORT_CONTENT_TYPES, PDF_SYNC_MAX_ROWS, write_report
+from ..jobs import enqueue_report
+from ..models import ReportJob
+from .serializers import ReportRequestSerializer, ReportJobSerializer
+
+# Сколько последних заданий показывать в списке
+REPORT_JOBS_LIST_LIMIT = 20
+
+
+def job_response(request, job):
+    return Response(
+        ReportJobSerializer(job, context={'request': request}).data,
+        status=status.HTTP_200_OK if job.status == ReportJob.DONE else status.HTTP_202_ACCEPTED
+    )
 
 
 class ReportGenerateView(APIView):
@@ -21,115 +33,69 @@ class ReportGenerateView(APIView):
         filters = serializer.validated_data.get('filters', {})
         format = serializer.validated_data['format']
 
-        queryset = self._get_filtered_queryset(request.user, filters)
-
-        if report_type == 'objects_period':
-            data = self._prepare_objects_data(queryset)
-        elif report_type == 'by_responsible':
-            data = self._prepare_responsible_data(queryset)
-        elif report_type == 'problematic':
-            data = self._prepare_problematic_data(queryset)
-        else:
+        if report_type not in REPORT_BUILDERS:
             return Response(
                 {'error': 'Неизвестный тип отчёта'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if format == 'pdf':
-            return self._generate_pdf(report_type, data)
-        elif format == 'xlsx':
-            return self._generate_xlsx(report_type, data)
-
-    def _get_filtered_queryset(self, user, filters):
-        queryset = Object.objects.select_related(
-            'status', 'responsible', 'responsible__role'
-        ).all()
-
-        user_role = getattr(user, 'role', None)
-        role_name = getattr(user_role, 'name', '') if user_role else ''
-
-        if role_name == 'master':
-            queryset = queryset.filter(responsible=user)
-        elif role_name not in ['admin', 'manager']:
-            queryset = queryset.none()
-
-        if filters.get('start_date'):
-            queryset = queryset.filter(start_date__gte=filters['start_date'])
-        if filters.get('end_date'):
-            queryset = queryset.filter(end_date__lte=filters['end_date'])
-        if filters.get('status'):
-            queryset = queryset.filter(status_id=filters['status'])
-        if filters.get('responsible'):
-            queryset = queryset.filter(responsible_id=filters['responsible'])
-        if filters.get('region'):
-            queryset = queryset.filter(region__icontains=filters['region'])
-
-        return queryset
-
-    def _prepare_objects_data(self, queryset):
-        return [
-            {
-                'code': obj.code or '',
-                'title': obj.title,
-                'address': obj.address,
-                'region': obj.region or '',
-                'status': obj.status.name if obj.status else '',
-                'responsible': f"{obj.responsible.last_name or ''} {obj.responsible.first_name or ''}".strip() if obj.responsible else '',
-                'start_date': obj.start_date.strftime('%d.%m.%Y') if obj.start_date else '',
-                'end_date': obj.end_date.strftime('%d.%m.%Y') if obj.end_date else '',
-                'description': obj.description or '',
-            }
-            for obj in queryset
-        ]
-
-    def _prepare_responsible_data(self, queryset):
-        stats = queryset.values(
-            'responsible__id',
-            'responsible__last_name',
-            'responsible__first_name',
-            'responsible__role__name'
-        ).annotate(
-            total_count=Count('id'),
-            completed_count=Count(
-                Case(
-                    When(status__name='Завершён', then=1),
-                    output_field=CharField()
-                )
-            ),
-            in_progress_count=Count(
-                Case(
-                    When(status__name='В работе', then=1),
-                    output_field=CharField()
-                )
-            ),
-            overdue_count=Count(
-                Case(
-                    When(
-                        end_date__lt=date.today(),
-                        status__name__in=['В работе', 'Планируется'],
-                        then=1
-                    ),
-                    output_field=CharField()
-                )
-            )
-        )
-        return list(stats)
+        if format == 'pdf' and count_report_rows(report_type, request.user, filters) > PDF_SYNC_MAX_ROWS:
+            # Большой PDF не рендерим в веб-воркере — ставим в очередь, как POST /jobs/
+            return job_response(request, enqueue_report(request.user, report_type, filters, format))
 
-    def _prepare_problematic_data(self, queryset):
-        today = date.today()
-        problematic = queryset.filter(
-            Q(end_date__lt=today) & ~Q(status__name='Завершён')
-        )
-        return self._prepare_objects_data(problematic)
+        data = build_report_data(report_type, request.user, filters)
 
-    def _generate_pdf(self, report_type, data):
-        return Response(
-            {'message': 'PDF '},
-            status=status.HTTP_200_OK
+        output = tempfile.TemporaryFile()
+        write_report(report_type, format, data, output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f'{report_type}_{date.today():%Y%m%d}.{format}',
+            content_type=REPORT_CONTENT_TYPES[format]
         )
 
-    def _generate_xlsx(self, report_type, data):
-        return Response(
-            {'message': 'Excel '},
-            status=status.HTTP_200_OK
-        )
\ No newline at end of file
+
+class ReportJobListCreateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        jobs = ReportJob.objects.filter(user=request.user)[:REPORT_JOBS_LIST_LIMIT]
+        return Response(ReportJobSerializer(jobs, many=True, context={'request': request}).data)
+
+    def post(self, request):
+        serializer = ReportRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        report_type = serializer.validated_data['report_type']
+        filters = serializer.validated_data.get('filters', {})
+        format = serializer.validated_data['format']
+
+        return job_response(request, enqueue_report(request.user, report_type, filters, format))
+
+
+class ReportJobDetailView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob, pk=pk, user=request.user)
+        return Response(ReportJobSerializer(job, context={'request': request}).data)
+
+
+class ReportJobDownloadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        job = get_object_or_404(ReportJob, pk=pk, user=request.user)
+        if job.status != ReportJob.DONE or not job.result:
+            return Response(
+                {'error': 'Отчёт ещё не готов'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return FileResponse(
+            job.result.open('rb'),
+            as_attachment=True,
+            filename=f'{job.report_type}_{job.created_at:%Y%m%d}.{job.format}',
+            content_type=REPORT_CONTENT_TYPES[job.format]
+        )
@@ -0,0 +1,149 @@
+from django.db.models import Count, Q, Sum
+from datetime import date
+from ..objects.models import Status, Object, ObjectStat
+from ..objects.registry import status_registry
+from ..users.permissions import get_role_scope, scope_queryset
+
+# Размер порции при чтении объектов для отчёта
+REPORT_CHUNK_SIZE = 2000
+
+
+def filter_objects(user, filters):
+    queryset = Object.objects.select_related(
+        'status', 'responsible', 'responsible__role'
+    ).all()
+    queryset = scope_queryset(queryset, user)
+
+    if filters.get('start_date'):
+        queryset = queryset.filter(start_date__gte=filters['start_date'])
+    if filters.get('end_date'):
+        queryset = queryset.filter(end_date__lte=filters['end_date'])
+    if filters.get('status'):
+        queryset = queryset.filter(status_id=filters['status'])
+    if filters.get('responsible'):
+        queryset = queryset.filter(responsible_id=filters['responsible'])
+    if filters.get('region'):
+        queryset = queryset.filter(region__icontains=filters['region'])
+
+    return queryset
+
+
+def prepare_objects_data(queryset):
+    rows = queryset.values_list(
+        'code', 'title', 'address', 'region', 'status__name',
+        'responsible__last_name', 'responsible__first_name',
+        'start_date', 'end_date', 'description',
+    ).iterator(chunk_size=REPORT_CHUNK_SIZE)
+
+    for (code, title, address, region, status_name, last_name, first_name,
+         start_date, end_date, description) in rows:
+        yield {
+            'code': code or '',
+            'title': title,
+            'address': address,
+            'region': region or '',
+            'status': status_name or '',
+            'responsible': f"{last_name or ''} {first_name or ''}".strip(),
+            'start_date': start_date.strftime('%d.%m.%Y') if start_date else '',
+            'end_date': end_date.strftime('%d.%m.%Y') if end_date else '',
+            'description': description or '',
+        }
+
+
+def prepare_responsible_data(queryset):
+    # Один GROUP BY с COUNT(...) FILTER (WHERE status_id IN ...): без join на statuses и сравнения строк
+    completed_ids = status_registry.ids_for_categories(Status.COMPLETED)
+    in_progress_ids = status_registry.ids_for_categories(Status.IN_PROGRESS)
+    open_ids = status_registry.ids_for_categories(Status.PLANNED, Status.IN_PROGRESS)
+
+    stats = queryset.order_by().values(
+        'responsible__id',
+        'responsible__last_name',
+        'responsible__first_name',
+        'responsible__role__name'
+    ).annotate(
+        total_count=Count('id'),
+        completed_count=Count('id', filter=Q(status_id__in=completed_ids)),
+        in_progress_count=Count('id', filter=Q(status_id__in=in_progress_ids)),
+        overdue_count=Count('id', filter=Q(status_id__in=open_ids, end_date__lt=date.today())),
+    )
+    return list(stats)
+
+
+def filter_object_stats(user, filters):
+    queryset = scope_queryset(ObjectStat.objects.filter(count__gt=0), user)
+
+    if filters.get('status'):
+        queryset = queryset.filter(status_id=filters['status'])
+    if filters.get('responsible'):
+        queryset = queryset.filter(responsible_id=filters['responsible'])
+    if filters.get('region'):
+        queryset = queryset.filter(region__icontains=filters['region'])
+
+    return queryset
+
+
+def prepare_responsible_stats_data(user, filters):
+    # Итоги по статусам берутся из сводки object_stats; считать по objects
+    # остаётся только просрочку — она зависит от текущей даты
+    completed_ids = status_registry.ids_for_categories(Status.COMPLETED)
+    in_progress_ids = status_registry.ids_for_categories(Status.IN_PROGRESS)
+    open_ids = status_registry.ids_for_categories(Status.PLANNED, Status.IN_PROGRESS)
+
+    stats = list(
+        filter_object_stats(user, filters).order_by().values(
+            'responsible__id',
+            'responsible__last_name',
+            'responsible__first_name',
+            'responsible__role__name'
+        ).annotate(
+            total_count=Sum('count'),
+            completed_count=Sum('count', filter=Q(status_id__in=completed_ids), default=0),
+            in_progress_count=Sum('count', filter=Q(status_id__in=in_progress_ids), default=0),
+        )
+    )
+
+    overdue = dict(
+        filter_objects(user, filters)
+        .filter(status_id__in=open_ids, end_date__lt=date.today())
+        .order_by()
+        .values('responsible_id')
+        .annotate(overdue_count=Count('id'))
+        .values_list('responsible_id', 'overdue_count')
+    )
+    for row in stats:
+        row['overdue_count'] = overdue.get(row['responsible__id'], 0)
+    return stats
+
+
+def get_problematic_queryset(queryset):
+    completed_ids = status_registry.ids_for_categories(Status.COMPLETED)
+    return queryset.filter(end_date__lt=date.today()).exclude(status_id__in=completed_ids)
+
+
+def prepare_problematic_data(queryset):
+    return prepare_objects_data(get_problematic_queryset(queryset))
+
+
+REPORT_BUILDERS = {
+    'objects_period': prepare_objects_data,
+    'by_responsible': prepare_responsible_data,
+    'problematic': prepare_problematic_data,
+}
+
+
+def count_report_rows(report_type, user, filters):
+    queryset = filter_objects(user, filters)
+    if report_type == 'by_responsible':
+        # Строка отчёта — ответственный
+        return queryset.order_by().values('responsible_id').distinct().count()
+    if report_type == 'problematic':
+        queryset = get_problematic_queryset(queryset)
+    return queryset.count()
+
+
+def build_report_data(report_type, user, filters):
+    # Фильтры по датам в сводке не представлены — тогда считаем по самим объектам
+    if report_type == 'by_responsible' and not (filters.get('start_date') or filters.get('end_date')):
+        return prepare_responsible_stats_data(user, filters)
+    return REPORT_BUILDERS[report_type](filter_objects(user, filters))
@@ -0,0 +1,108 @@
+import io
+from itertools import chain, islice
+from django.template.loader import render_to_string
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+REPORT_TITLES = {
+    'objects_period': 'Объекты за период',
+    'by_responsible': 'По сотрудникам',
+    'problematic': 'Проблемные объекты',
+}
+
+OBJECT_COLUMNS = [
+    ('code', 'Код'),
+    ('title', 'Название'),
+    ('address', 'Адрес'),
+    ('region', 'Район'),
+    ('status', 'Статус'),
+    ('responsible', 'Ответственный'),
+    ('start_date', 'Начало работ'),
+    ('end_date', 'Окончание работ'),
+    ('description', 'Описание'),
+]
+
+REPORT_COLUMNS = {
+    'objects_period': OBJECT_COLUMNS,
+    'problematic': OBJECT_COLUMNS,
+    'by_responsible': [
+        ('responsible__last_name', 'Фамилия'),
+        ('responsible__first_name', 'Имя'),
+        ('responsible__role__name', 'Роль'),
+        ('total_count', 'Всего объектов'),
+        ('completed_count', 'Завершено'),
+        ('in_progress_count', 'В работе'),
+        ('overdue_count', 'Просрочено'),
+    ],
+}
+
+REPORT_CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Строк на один HTML-фрагмент при рендеринге PDF
+PDF_CHUNK_ROWS = 500
+# PDF больше чем на PDF_SYNC_MAX_ROWS строк формируется только в очереди заданий, не в веб-воркере
+PDF_SYNC_MAX_ROWS = 2000
+
+
+def _xlsx_value(value):
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    return value
+
+
+def write_xlsx(report_type, rows, output):
+    # write_only: строки сразу уходят во временный XML на диске, книга не держится в памяти
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=REPORT_TITLES[report_type][:31])
+    columns = REPORT_COLUMNS[report_type]
+
+    sheet.append([title for _, title in columns])
+    for row in rows:
+        sheet.append([_xlsx_value(row[key]) for key, _ in columns])
+
+    workbook.save(output)
+
+
+def _chunks(rows, size):
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_pdf(report_type, rows, output, generated_at):
+    from pypdf import PdfWriter
+    from weasyprint import HTML
+
+    columns = REPORT_COLUMNS[report_type]
+    chunks = _chunks(rows, PDF_CHUNK_ROWS)
+    writer = PdfWriter()
+    # Каждая часть таблицы рендерится в отдельный PDF и сразу дописывается в общий файл:
+    # разметка WeasyPrint живёт только для PDF_CHUNK_ROWS строк, дальше копятся готовые страницы.
+    # Пустой отчёт — одна часть без строк
+    for index, chunk in enumerate(chain([next(chunks, [])], chunks)):
+        html = render_to_string('reports/report.html', {
+            'title': REPORT_TITLES[report_type],
+            'generated_at': generated_at,
+            'headers': [title for _, title in columns],
+            'rows': [[row[key] for key, _ in columns] for row in chunk],
+            'is_first_chunk': index == 0,
+        })
+        part = io.BytesIO()
+        HTML(string=html).write_pdf(part)
+        writer.append(part)
+
+    writer.write(output)
+
+
+def write_report(report_type, format, rows, output):
+    if format == 'pdf':
+        write_pdf(report_type, rows, output, timezone.now())
+    elif format == 'xlsx':
+        write_xlsx(report_type, rows, output)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import date, timedelta
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from ..objects.cache import get_objects_version
+from .api.serializers import ReportFilterSerializer
+from .builders import build_report_data, count_report_rows, get_role_scope
+from .generators import write_report
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+# Как часто (в строках) обновлять прогресс задания
+PROGRESS_STEP_ROWS = 2000
+# Задания в состоянии running дольше этого срока считаются брошенными и возвращаются в очередь
+STALE_JOB_TIMEOUT = timedelta(hours=1)
+# Отчёты, в которых просрочка считается от текущей даты: вчерашний файл сегодня не годится
+DATE_DEPENDENT_REPORTS = {'problematic', 'by_responsible'}
+
+
+def normalize_filters(filters):
+    return json.loads(json.dumps(filters, cls=DjangoJSONEncoder))
+
+
+def make_cache_key(report_type, filters, format, user):
+    payload = {
+        'report_type': report_type,
+        'filters': normalize_filters(filters),
+        'format': format,
+        'scope': get_role_scope(user),
+        # Версию увеличивают сигналы объектов, статусов и пользователей; чтобы её видели
+        # все процессы, нужен общий кеш (см. CACHES)
+        'version': get_objects_version(),
+    }
+    if report_type in DATE_DEPENDENT_REPORTS:
+        payload['date'] = date.today()
+    payload = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def find_cached_result(cache_key):
+    job = (
+        ReportJob.objects
+        .filter(cache_key=cache_key, status=ReportJob.DONE)
+        .exclude(result='')
+        .order_by('-finished_at')
+        .first()
+    )
+    if job and job.result and job.result.storage.exists(job.result.name):
+        return job
+    return None
+
+
+def enqueue_report(user, report_type, filters, format):
+    cache_key = make_cache_key(report_type, filters, format, user)
+    job = ReportJob(
+        user=user,
+        report_type=report_type,
+        filters=normalize_filters(filters),
+        format=format,
+        cache_key=cache_key,
+    )
+
+    cached = find_cached_result(cache_key)
+    if cached:
+        now = timezone.now()
+        job.status = ReportJob.DONE
+        job.progress = 100
+        job.result = cached.result.name
+        job.started_at = now
+        job.finished_at = now
+
+    job.save()
+    return job
+
+
+def requeue_stale_jobs():
+    return ReportJob.objects.filter(
+        status=ReportJob.RUNNING,
+        started_at__lt=timezone.now() - STALE_JOB_TIMEOUT,
+    ).update(status=ReportJob.PENDING, progress=0)
+
+
+def claim_jobs(limit):
+    with transaction.atomic():
+        # Одинаковый отчёт, который уже формируется, не берём: дождёмся его и используем результат
+        running_keys = ReportJob.objects.filter(status=ReportJob.RUNNING).values('cache_key')
+        pending = (
+            ReportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ReportJob.PENDING)
+            .exclude(cache_key__in=running_keys)
+            .order_by('created_at')
+            .values_list('id', 'cache_key')[:limit]
+        )
+        # Из одинаковых заданий берём первое, остальные останутся в очереди и возьмут его файл
+        # (DISTINCT с FOR UPDATE PostgreSQL не допускает — отбираем здесь)
+        job_ids, claimed_keys = [], set()
+        for job_id, cache_key in pending:
+            if cache_key not in claimed_keys:
+                claimed_keys.add(cache_key)
+                job_ids.append(job_id)
+        ReportJob.objects.filter(id__in=job_ids).update(
+            status=ReportJob.RUNNING,
+            started_at=timezone.now(),
+        )
+    return job_ids
+
+
+def _track_progress(job_id, rows, total):
+    for index, row in enumerate(rows, start=1):
+        if total and index % PROGRESS_STEP_ROWS == 0:
+            ReportJob.objects.filter(id=job_id).update(progress=min(99, index * 100 // total))
+        yield row
+
+
+def process_job(job_id):
+    try:
+        job = ReportJob.objects.select_related('user__role').get(id=job_id)
+
+        cached = find_cached_result(job.cache_key)
+        if cached:
+            job.result = cached.result.name
+        else:
+            filters = ReportFilterSerializer(data=job.filters)
+            filters.is_valid(raise_exception=True)
+            total = count_report_rows(job.report_type, job.user, filters.validated_data)
+            data = build_report_data(job.report_type, job.user, filters.validated_data)
+            rows = _track_progress(job.id, data, total)
+
+            with tempfile.TemporaryFile() as output:
+                write_report(job.report_type, job.format, rows, output)
+                output.seek(0)
+                job.result.save(f'{job.report_type}_{job.id}.{job.format}', File(output), save=False)
+
+        job.status = ReportJob.DONE
+        job.progress = 100
+        job.finished_at = timezone.now()
+        job.save(update_fields=['result', 'status', 'progress', 'finished_at'])
+    except Exception as exc:
+        logger.exception('Не удалось сформировать отчёт %s', job_id)
+        ReportJob.objects.filter(id=job_id).update(
+            status=ReportJob.FAILED,
+            error=str(exc),
+            finished_at=timezone.now(),
+        )
+
+
+def run_job(job_id):
+    try:
+        process_job(job_id)
+    finally:
+        # Задание выполняется в потоке пула — соединение этого потока больше не нужно
+        connection.close()
@@ -0,0 +1,117 @@
+import random
+import time
+from datetime import date, timedelta
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Case, When, CharField
+from ....objects.cache import bump_version
+from ....objects.models import Status, Object
+from ....objects.registry import STATUSES_VERSION_KEY
+from ....users.models import Role, User
+from ...builders import prepare_responsible_data
+
+BENCHMARK_STATUSES = [
+    ('Планируется', Status.PLANNED),
+    ('В работе', Status.IN_PROGRESS),
+    ('Завершён', Status.COMPLETED),
+    ('Приостановлен', Status.OTHER),
+]
+
+
+def legacy_responsible_data(queryset):
+    # Прежняя реализация: сравнение названий статусов через join и Case/When
+    stats = queryset.values(
+        'responsible__id',
+        'responsible__last_name',
+        'responsible__first_name',
+        'responsible__role__name'
+    ).annotate(
+        total_count=Count('id'),
+        completed_count=Count(Case(When(status__name='Завершён', then=1), output_field=CharField())),
+        in_progress_count=Count(Case(When(status__name='В работе', then=1), output_field=CharField())),
+        overdue_count=Count(Case(
+            When(end_date__lt=date.today(), status__name__in=['В работе', 'Планируется'], then=1),
+            output_field=CharField()
+        )),
+    )
+    return list(stats)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает прежний и текущий запрос отчёта by_responsible на синтетических данных (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=1_000_000)
+        parser.add_argument('--responsibles', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options['objects'], options['responsibles'], options['batch_size'])
+                self._run(options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Тестовые данные откатены')
+        finally:
+            bump_version(STATUSES_VERSION_KEY)
+
+    def _seed(self, objects_count, responsibles_count, batch_size):
+        started = time.perf_counter()
+        role, _ = Role.objects.get_or_create(name=Role.MASTER)
+        users = User.objects.bulk_create([
+            User(username=f'benchmark_{i}', last_name=f'Мастер {i}', role=role)
+            for i in range(responsibles_count)
+        ])
+        statuses = []
+        for name, category in BENCHMARK_STATUSES:
+            status, _ = Status.objects.update_or_create(name=name, defaults={'category': category})
+            statuses.append(status)
+        bump_version(STATUSES_VERSION_KEY)
+
+        today = date.today()
+        for offset in range(0, objects_count, batch_size):
+            Object.objects.bulk_create([
+                Object(
+                    code=f'BENCH-{offset + i}',
+                    title=f'Объект {offset + i}',
+                    address='Владивосток',
+                    coordinates=Point(131.8 + random.random() * 0.2, 43.0 + random.random() * 0.2, srid=4326),
+                    status=random.choice(statuses),
+                    responsible=random.choice(users),
+                    start_date=today - timedelta(days=random.randint(30, 365)),
+                    end_date=today + timedelta(days=random.randint(-30, 60)),
+                )
+                for i in range(min(batch_size, objects_count - offset))
+            ])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE objects')
+        self.stdout.write(
+            f'Создано объектов: {objects_count}, ответственных: {responsibles_count} '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+
+    def _run(self, repeat):
+        queryset = Object.objects.all()
+        results = {}
+        for name, builder in [('legacy', legacy_responsible_data), ('current', prepare_responsible_data)]:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = builder(queryset)
+                timings.append(time.perf_counter() - started)
+            results[name] = rows
+            self.stdout.write(f'{name:>8}: лучшее {min(timings) * 1000:.0f} мс, среднее {sum(timings) / len(timings) * 1000:.0f} мс')
+
+        def key(row):
+            return row['responsible__id']
+
+        same = sorted(results['legacy'], key=key) == sorted(results['current'], key=key)
+        self.stdout.write(f'Результаты совпадают: {"да" if same else "нет"}')
@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.core.management.base import BaseCommand
+from ...jobs import claim_jobs, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Формирует отчёты из очереди report_jobs в пуле потоков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Число потоков формирования')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Пауза между опросами очереди, сек.')
+        parser.add_argument('--once', action='store_true', help='Обработать текущую очередь и завершиться')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        poll_interval = options['poll_interval']
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь зависших заданий: {requeued}')
+
+        self.stdout.write(f'Обработчик отчётов запущен, потоков: {workers}')
+        active = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    free_slots = workers - len(active)
+                    job_ids = claim_jobs(free_slots) if free_slots else []
+                    for job_id in job_ids:
+                        active.add(pool.submit(run_job, job_id))
+
+                    if not active:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, active = wait(active, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    active = set(active)
+            except KeyboardInterrupt:
+                self.stdout.write('Остановка: дожидаемся текущих заданий')
@@ -1,3 +1,85 @@
 from django.db import models
+from ..users.models import User
 
-# Create your models here.
+
+class ReportJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Формируется'),
+        (DONE, 'Готов'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='report_jobs',
+        verbose_name='Пользователь'
+    )
+    report_type = models.CharField(
+        max_length=50,
+        verbose_name='Тип отчёта'
+    )
+    filters = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Фильтры'
+    )
+    format = models.CharField(
+        max_length=10,
+        verbose_name='Формат'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        db_index=True,
+        verbose_name='Состояние'
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Прогресс, %'
+    )
+    cache_key = models.CharField(
+        max_length=64,
+        db_index=True,
+        verbose_name='Ключ кеша результата'
+    )
+    result = models.FileField(
+        upload_to='reports/%Y/%m/',
+        blank=True,
+        null=True,
+        verbose_name='Файл отчёта'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начало формирования'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Окончание формирования'
+    )
+
+    class Meta:
+        db_table = 'report_jobs'
+        verbose_name = 'Задание на отчёт'
+        verbose_name_plural = 'Задания на отчёты'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.report_type}.{self.format} ({self.get_status_display()})"
@@ -1,3 +1,233 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from pypdf import PdfReader
+from rest_framework.test import APIClient
+from ..objects.cache import bump_version
+from ..objects.models import Status, Object
+from ..objects.registry import STATUSES_VERSION_KEY
+from ..users.models import Role, User
+from .builders import build_report_data
+from .generators import OBJECT_COLUMNS, REPORT_CONTENT_TYPES, write_pdf, write_xlsx
+from .jobs import claim_jobs, make_cache_key, process_job
+from .models import ReportJob
 
-# Create your tests here.
+ROWS = [
+    {
+        'code': 'OBJ-00001', 'title': 'Сквер', 'address': 'ул. Светланская, 1', 'region': 'Ленинский',
+        'status': 'В работе', 'responsible': 'Иванов Иван', 'start_date': '01.02.2025',
+        'end_date': '01.03.2025', 'description': 'Озеленение; «кавычки»',
+    },
+    {
+        'code': 'OBJ-00002', 'title': 'Парк', 'address': 'ул. Алеутская, 2', 'region': '',
+        'status': 'Завершён', 'responsible': '', 'start_date': '01.04.2025',
+        'end_date': '', 'description': '',
+    },
+]
+HEADERS = [title for _, title in OBJECT_COLUMNS]
+
+
+class ReportWriterTests(SimpleTestCase):
+    def test_xlsx(self):
+        output = io.BytesIO()
+        write_xlsx('objects_period', iter(ROWS), output)
+
+        output.seek(0)
+        sheet = load_workbook(output, read_only=True).active
+        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(rows[0], HEADERS)
+        self.assertEqual(rows[1][:2], ['OBJ-00001', 'Сквер'])
+        self.assertEqual(len(rows), 3)
+
+    def test_pdf(self):
+        output = io.BytesIO()
+        write_pdf('objects_period', iter(ROWS), output, timezone.now())
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+    @mock.patch('apps.reports.generators.PDF_CHUNK_ROWS', 1)
+    def test_pdf_chunks_are_merged(self):
+        output = io.BytesIO()
+        write_pdf('objects_period', iter(ROWS), output, timezone.now())
+
+        output.seek(0)
+        self.assertEqual(len(PdfReader(output).pages), 2)
+
+    def test_empty_rows(self):
+        output = io.BytesIO()
+        write_xlsx('by_responsible', iter([]), output)
+        output.seek(0)
+        self.assertEqual(len(list(load_workbook(output, read_only=True).active.iter_rows())), 1)
+
+        output = io.BytesIO()
+        write_pdf('problematic', iter([]), output, timezone.now())
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+
+class ReportGenerateViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='password', role=Role.objects.create(name=Role.MANAGER))
+        status = Status.objects.create(name='В работе', color='#007bff', order=1)
+        for index in range(3):
+            Object.objects.create(
+                title=f'Объект {index}',
+                address='ул. Светланская, 1',
+                coordinates=Point(131.8853, 43.1155, srid=4326),
+                status=status,
+                responsible=cls.manager,
+                start_date=date(2025, 1, 1),
+                end_date=date(2025, 12, 31),
+            )
+
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        self.url = reverse('reports:report-generate')
+
+    def test_xlsx_is_returned_as_file(self):
+        response = self.client.post(self.url, {'report_type': 'objects_period', 'format': 'xlsx'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], REPORT_CONTENT_TYPES['xlsx'])
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        self.assertEqual(len(list(sheet.iter_rows())), 4)
+
+    @mock.patch('apps.reports.api.views.PDF_SYNC_MAX_ROWS', 2)
+    def test_large_pdf_goes_to_job_queue(self):
+        response = self.client.post(self.url, {'report_type': 'objects_period', 'format': 'pdf'}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(ReportJob.objects.get(id=response.data['id']).status, ReportJob.PENDING)
+
+
+class ReportJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='password', role=Role.objects.create(name=Role.MANAGER))
+        cls.object = Object.objects.create(
+            title='Объект',
+            address='ул. Светланская, 1',
+            coordinates=Point(131.8853, 43.1155, srid=4326),
+            status=Status.objects.create(name='В работе', color='#007bff', order=1),
+            responsible=cls.manager,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 12, 31),
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = self.settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        bump_version(STATUSES_VERSION_KEY)
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        self.url = reverse('reports:report-job-list')
+        self.request = {'report_type': 'objects_period', 'format': 'xlsx'}
+
+    def test_job_is_queued_built_and_downloaded(self):
+        response = self.client.post(self.url, self.request, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['id']
+
+        self.assertEqual(claim_jobs(5), [job_id])
+        process_job(job_id)
+
+        response = self.client.get(reverse('reports:report-job-detail', args=[job_id]))
+        self.assertEqual((response.data['status'], response.data['progress']), (ReportJob.DONE, 100))
+        response = self.client.get(reverse('reports:report-job-download', args=[job_id]))
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        self.assertIn('Объект', [row[1] for row in sheet.iter_rows(values_only=True)])
+
+    def test_identical_request_reuses_result(self):
+        first = ReportJob.objects.get(id=self.client.post(self.url, self.request, format='json').data['id'])
+        claim_jobs(5)
+        process_job(first.id)
+
+        response = self.client.post(self.url, self.request, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        self.assertEqual(ReportJob.objects.get(id=response.data['id']).result.name, first.result.name)
+
+    def test_duplicate_jobs_are_claimed_once(self):
+        first = self.client.post(self.url, self.request, format='json').data['id']
+        self.client.post(self.url, self.request, format='json')
+
+        self.assertEqual(claim_jobs(5), [first])
+        self.assertEqual(claim_jobs(5), [])
+
+    def test_cache_key_follows_data_and_date(self):
+        key = make_cache_key('objects_period', {}, 'xlsx', self.manager)
+        self.object.title = 'Другое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.object.save()
+        self.assertNotEqual(make_cache_key('objects_period', {}, 'xlsx', self.manager), key)
+
+        key = make_cache_key('objects_period', {}, 'xlsx', self.manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.save(update_fields=['last_login'])
+        self.assertEqual(make_cache_key('objects_period', {}, 'xlsx', self.manager), key)
+        self.manager.last_name = 'Петров'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.save()
+        self.assertNotEqual(make_cache_key('objects_period', {}, 'xlsx', self.manager), key)
+
+        key = make_cache_key('problematic', {}, 'xlsx', self.manager)
+        with mock.patch('apps.reports.jobs.date') as fake_date:
+            fake_date.today.return_value = date.today() + timedelta(days=1)
+            self.assertNotEqual(make_cache_key('problematic', {}, 'xlsx', self.manager), key)
+
+
+class ReportStatusCategoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(
+            'manager', password='password', last_name='Иванов', role=Role.objects.create(name=Role.MANAGER)
+        )
+        # Названия нестандартные: в отчёт статусы попадают только по категории
+        statuses = {
+            category: Status.objects.create(name=name, color='#007bff', order=order, category=category)
+            for order, (name, category) in enumerate([
+                ('Сдан заказчику', Status.COMPLETED),
+                ('Монтаж', Status.IN_PROGRESS),
+                ('Согласование', Status.PLANNED),
+                ('Приостановлен', Status.OTHER),
+            ])
+        }
+        for status in statuses.values():
+            Object.objects.create(
+                title=status.name,
+                address='ул. Светланская, 1',
+                coordinates=Point(131.8853, 43.1155, srid=4326),
+                status=status,
+                responsible=cls.manager,
+                start_date=date(2025, 1, 1),
+                end_date=date.today() - timedelta(days=1),
+            )
+
+    def setUp(self):
+        bump_version(STATUSES_VERSION_KEY)
+
+    def test_by_responsible_counts_by_category(self):
+        expected = {'total_count': 4, 'completed_count': 1, 'in_progress_count': 1, 'overdue_count': 2}
+        # без фильтра по датам — из сводки object_stats, с фильтром — по самим объектам
+        for filters in [{}, {'start_date': date(2025, 1, 1)}]:
+            with self.subTest(filters=filters):
+                [row] = build_report_data('by_responsible', self.manager, filters)
+                self.assertEqual({key: row[key] for key in expected}, expected)
+
+    def test_problematic_excludes_completed_category(self):
+        rows = build_report_data('problematic', self.manager, {})
+        self.assertEqual(sorted(row['title'] for row in rows), ['Монтаж', 'Приостановлен', 'Согласование'])
@@ -1,8 +1,11 @@
 from django.urls import path
-from .api.views import ReportGenerateView
+from .api.views import ReportGenerateView, ReportJobListCreateView, ReportJobDetailView, ReportJobDownloadView
 
 app_name = 'reports'
 
 urlpatterns = [
     path('generate/', ReportGenerateView.as_view(), name='report-generate'),
+    path('jobs/', ReportJobListCreateView.as_view(), name='report-job-list'),
+    path('jobs/<int:pk>/', ReportJobDetailView.as_view(), name='report-job-detail'),
+    path('jobs/<int:pk>/download/', ReportJobDownloadView.as_view(), name='report-job-download'),
 ]
\ No newline at end of file
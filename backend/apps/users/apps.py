@@ -1,6 +1,10 @@
 from django.apps import AppConfig
 
+
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
-    verbose_name = 'Пользователи'
\ No newline at end of file
+    verbose_name = 'Пользователи'
+
+    def ready(self):
+        from . import signals
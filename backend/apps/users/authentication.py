@@ -0,0 +1,104 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    LRU-кеш пользователей с ролью на время AUTH_USER_CACHE_TTL секунд, в памяти процесса.
+
+    Ключ — (id пользователя, iat токена): новый токен после входа или обновления
+    читает пользователя из базы заново. Изменения пользователей и ролей сбрасывают кеш
+    этого процесса сигналами; в остальных воркерах запись живёт не дольше TTL.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, user = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, user)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def forget(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            for key in [key for key in self._items if key[0] == user_id]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который читает пользователя вместе с ролью одним запросом
+    и кеширует его в user_cache: проверки прав (role_code) больше не ходят в базу.
+
+    Кеш используется только в безопасных запросах (GET, HEAD, OPTIONS): изменяющие
+    запросы могут сохранить request.user, поэтому пользователь для них читается заново.
+    """
+    use_cache = True
+
+    def authenticate(self, request):
+        # Экземпляр аутентификатора создаётся на каждый запрос — хранить флаг в нём безопасно
+        self.use_cache = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        key = (str(user_id), validated_token.get('iat'))
+        user = user_cache.get(key) if self.use_cache else None
+        if user is None:
+            user = self.user_model.objects.select_related('role').filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).first()
+            if user is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            user_cache.set(key, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        # Экземпляр в кеше общий для всех запросов — каждому отдаём свою копию
+        return copy.copy(user)
@@ -111,5 +111,10 @@ class User(AbstractUser):
         verbose_name_plural = 'Пользователи'
         ordering = ['username']
 
+    @property
+    def role_code(self):
+        """Код роли ('admin', 'manager', 'master') или пустая строка, если роль не назначена."""
+        return self.role.name if self.role_id else ''
+
     def __str__(self):
         return f"{self.username} ({self.role.get_name_display() if self.role else 'Без роли'})"
\ No newline at end of file
@@ -1,11 +1,45 @@
 from rest_framework import permissions
+from .models import Role
+
+# Роли, которым видны все объекты; мастеру — только те, где он ответственный
+FULL_ACCESS_ROLES = (Role.ADMIN, Role.MANAGER)
+
+
+def get_role_code(user):
+    # У AnonymousUser нет role_code
+    return getattr(user, 'role_code', '')
+
+
+def get_role_scope(user):
+    """Область видимости пользователя строкой — для ключей кеша: 'all', 'master:<id>' или 'none'."""
+    role_code = get_role_code(user)
+    if role_code in FULL_ACCESS_ROLES:
+        return 'all'
+    if role_code == Role.MASTER:
+        return f'master:{user.id}'
+    return 'none'
+
+
+def scope_queryset(queryset, user, responsible_field='responsible'):
+    """
+    Ограничивает queryset тем, что видит пользователь: администратор и менеджер — всё,
+    мастер — записи, где он ответственный (responsible_field — путь к ответственному),
+    остальные — ничего.
+    """
+    role_code = get_role_code(user)
+    if role_code in FULL_ACCESS_ROLES:
+        return queryset
+    if role_code == Role.MASTER:
+        return queryset.filter(**{responsible_field: user})
+    return queryset.none()
+
 
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role.name == 'admin'
+        return request.user.is_authenticated and get_role_code(request.user) == Role.ADMIN
 
 class IsManagerOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user.is_authenticated:
             return False
-        return request.user.role.name in ['admin', 'manager']
\ No newline at end of file
+        return get_role_code(request.user) in FULL_ACCESS_ROLES
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from ..objects.cache import bump_objects_version
+from .authentication import user_cache
+from .models import Role, User
+
+
+# Пользователь или роль изменились — закешированные при аутентификации копии устарели
+
+@receiver([post_save, post_delete], sender=User)
+def forget_cached_user(sender, instance, update_fields=None, **kwargs):
+    user_cache.forget(instance.pk)
+    # ФИО и логин ответственного входят в списки объектов и отчёты; вход в систему
+    # обновляет только last_login и кеши не сбрасывает
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        transaction.on_commit(bump_objects_version)
+
+
+@receiver([post_save, post_delete], sender=Role)
+def forget_cached_users(sender, **kwargs):
+    user_cache.clear()
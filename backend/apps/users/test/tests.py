@@ -1,3 +1,55 @@
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ..authentication import user_cache
+from ..models import Role, User
+from ..permissions import get_role_scope, scope_queryset
 
-# Create your tests here.
+
+class RoleScopeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='password', role=Role.objects.create(name=Role.MANAGER))
+        cls.master = User.objects.create_user('master', password='password', role=Role.objects.create(name=Role.MASTER))
+        cls.guest = User.objects.create_user('guest', password='password')
+
+    def test_scope_by_role(self):
+        # Пользователи как «объекты» с ответственным — сами они (поле pk)
+        queryset = User.objects.all()
+        self.assertEqual(scope_queryset(queryset, self.manager, 'pk').count(), 3)
+        self.assertEqual(list(scope_queryset(queryset, self.master, 'pk')), [self.master])
+        self.assertEqual(scope_queryset(queryset, self.guest, 'pk').count(), 0)
+
+        self.assertEqual(get_role_scope(self.manager), 'all')
+        self.assertEqual(get_role_scope(self.master), f'master:{self.master.id}')
+        self.assertEqual(get_role_scope(self.guest), 'none')
+        self.assertEqual(self.guest.role_code, '')
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = Role.objects.create(name=Role.MASTER)
+        cls.user = User.objects.create_user('master', password='password', role=cls.role)
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_user_and_role_cached_between_requests(self):
+        self.client.get(reverse('user'))
+        # Пользователь с ролью берётся из кеша — запросов к users и roles нет
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('user'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['role']['name'], Role.MASTER)
+
+    def test_user_change_resets_cache(self):
+        self.client.get(reverse('user'))
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(reverse('user'))
+        self.assertEqual(response.status_code, 401)
@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
@@ -13,6 +14,21 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Потоки фоновой обработки загруженных фото (apps/objects/images.py)
+IMAGE_PROCESSING_WORKERS = config('IMAGE_PROCESSING_WORKERS', default=2, cast=int)
+# Потоки параллельной записи загружаемых файлов в хранилище (apps/objects/uploads.py)
+UPLOAD_WORKERS = config('UPLOAD_WORKERS', default=4, cast=int)
+# Кто передаёт файлы /api/media/: '' — Django (FileResponse с Range), 'x-accel-redirect' — nginx,
+# 'x-sendfile' — Apache/lighttpd. Для nginx MEDIA_ACCEL_PREFIX — internal location с alias на MEDIA_ROOT
+MEDIA_ACCEL = config('MEDIA_ACCEL', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Кеш пользователей с ролью при JWT-аутентификации (apps/users/authentication.py)
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=1024, cast=int)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+# Реестр статусов в памяти процесса (apps/objects/registry.py): без общего кеша (CACHE_BACKEND)
+# изменения статусов доходят до других воркеров не позже чем через STATUS_REGISTRY_TTL секунд
+STATUS_REGISTRY_TTL = config('STATUS_REGISTRY_TTL', default=60, cast=int)
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -37,6 +53,7 @@ INSTALLED_APPS = [
 
     # GeoDjango
     'django.contrib.gis',
+    'django.contrib.postgres',
     'leaflet',
 
     # DRF
@@ -78,15 +95,23 @@ if DEBUG:
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.objects.api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
 
+# MessagePack (Accept: application/msgpack) доступен, только если установлен пакет msgpack
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('apps.objects.api.renderers.MessagePackRenderer')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
@@ -132,6 +157,15 @@ DATABASES = {
     }
 }
 
+# Версии кешей (тайлы, статусы) должны быть общими для всех воркеров —
+# в продакшене укажите общий бэкенд (Redis, Memcached, БД)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='gis-monitoring'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators